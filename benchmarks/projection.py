@@ -0,0 +1,158 @@
+"""
+Compare search hit processing for complete recipe documents and for the
+source fields that the search path requests, reporting the serialized size
+of each document and the time taken to parse it and produce a response.
+
+Usage:
+
+    python -m benchmarks.projection [--repeat N] [--ingredients N]
+
+The recipe document is generated locally, with a shape that resembles the
+documents in the recipes index; no search cluster is required.
+"""
+
+import argparse
+import json
+from statistics import median
+from time import perf_counter
+
+from reciperadar.models.recipes import Recipe
+from reciperadar.search.base import EntityClause
+
+NUTRITION = {
+    "carbohydrates": 12.5,
+    "carbohydrates_units": "g",
+    "energy": 180.0,
+    "energy_units": "cal",
+    "fat": 4.2,
+    "fat_units": "g",
+    "fibre": 1.3,
+    "fibre_units": "g",
+    "protein": 6.8,
+    "protein_units": "g",
+}
+
+
+def recipe_document(ingredient_count):
+    ingredients = [
+        {
+            "id": f"ingredient-{idx}",
+            "index": idx,
+            "description": f"{idx + 1} cups of chopped ingredient number {idx}",
+            "markup": (
+                f"<mark class='quantity'>{idx + 1} cups</mark> of chopped "
+                f"<mark class='product'>ingredient number {idx}</mark>"
+            ),
+            "product": {
+                "id": f"product-{idx}",
+                "product_parser": "knowledge-graph",
+                "singular": f"ingredient {idx}",
+                "plural": f"ingredients {idx}",
+                "category": "produce",
+                "contents": [f"ingredient {idx}"]
+                + [f"ancestor-{depth}-of-{idx}" for depth in range(8)],
+            },
+            "product_is_plural": False,
+            "product_name": f"ingredient {idx}",
+            "magnitude": idx + 1,
+            "magnitude_parser": "knowledge-graph",
+            "units": "cup",
+            "units_parser": "knowledge-graph",
+            "verb": "chop",
+            "nutrition": dict(NUTRITION),
+        }
+        for idx in range(ingredient_count)
+    ]
+    directions = [
+        {
+            "id": f"direction-{idx}",
+            "index": idx,
+            "description": "stir the ingredients together in a large pan",
+            "markup": (
+                "<mark class='action'>stir</mark> the ingredients together in a "
+                "large <mark class='utensil'>pan</mark>"
+            ),
+            "appliances": [{"appliance": "oven"}],
+            "utensils": [{"utensil": "pan"}],
+            "vessels": [{"vessel": "bowl"}],
+        }
+        for idx in range(ingredient_count)
+    ]
+    return {
+        "id": "recipe-0",
+        "title": "Benchmark Recipe",
+        "src": "https://www.example.test/recipes/benchmark",
+        "dst": "https://www.example.test/recipes/benchmark",
+        "domain": "example.test",
+        "author": "example",
+        "author_url": "https://www.example.test/authors/example",
+        "time": 45,
+        "servings": 4,
+        "rating": 4.5,
+        "indexed_at": "2024-01-01T00:00:00.000000",
+        "ingredients": ingredients,
+        "directions": directions,
+        "nutrition": dict(NUTRITION),
+        "nutrition_source": "crawler",
+        "contents": [
+            content for x in ingredients for content in x["product"]["contents"]
+        ],
+        "product_count": ingredient_count,
+        "is_dairy_free": True,
+        "is_gluten_free": False,
+        "is_vegan": False,
+        "is_vegetarian": True,
+    }
+
+
+def project(doc, fields):
+    # Apply a search source filter to a document, as the search engine would
+    subfields = {}
+    for field in fields:
+        name, _, subfield = field.partition(".")
+        subfields.setdefault(name, []).append(subfield)
+
+    projection = {}
+    for name, nested in subfields.items():
+        if name not in doc:
+            continue
+        value = doc[name]
+        if all(nested):
+            if isinstance(value, list):
+                value = [project(item, nested) for item in value]
+            else:
+                value = project(value, nested)
+        projection[name] = value
+    return projection
+
+
+def measure(payload, ingredients, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        start = perf_counter()
+        Recipe.from_doc(json.loads(payload)).to_dict(ingredients)
+        elapsed.append((perf_counter() - start) * 1000)
+    return median(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--ingredients", type=int, default=12)
+    args = parser.parse_args()
+
+    doc = recipe_document(args.ingredients)
+    ingredients = EntityClause.from_args(["ingredient 0", "ingredient 1"])
+    payloads = {
+        "full": json.dumps(doc),
+        "projected": json.dumps(project(doc, Recipe.SOURCE_FIELDS)),
+    }
+
+    print("source\tbytes\tparse_p50_ms")
+    for name, payload in payloads.items():
+        took = measure(payload, ingredients, args.repeat)
+        print(f"{name}\t{len(payload)}\t{took:.3f}")
+
+
+if __name__ == "__main__":
+    main()
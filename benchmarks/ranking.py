@@ -0,0 +1,105 @@
+"""
+Compare the 'script', 'rescore' and 'rerank' search ranking modes against a
+live search cluster, reporting the latency of retrieving the first page of
+25 ranked results and the overlap between the results that each mode returns.
+
+Each mode is measured with the same requests that a search sends; the
+search engine time is totalled across sequential rounds of requests, and the
+wall time includes any re-ranking within the API.
+
+Usage:
+
+    python -m benchmarks.ranking [--repeat N] [--sort SORT] [INGREDIENTS ...]
+
+Each INGREDIENTS argument is a comma-separated list of ingredient names.
+"""
+
+import argparse
+from statistics import median, quantiles
+from time import perf_counter
+
+from reciperadar.search.base import EntityClause
+from reciperadar.search.recipes import RecipeSearch
+
+DEFAULT_SEARCHES = [
+    "tomato",
+    "chicken",
+    "onion,garlic",
+    "tomato,basil,mozzarella",
+    "flour,butter,sugar,egg,milk",
+]
+
+
+def first_page(search, query, sort_params, ranking):
+    ranked = yield from search._rank_results(
+        query=query,
+        sort_params=sort_params,
+        ranking=ranking,
+        level=0,
+        aggregations={},
+        post_filter={},
+    )
+    results = yield from search._ranked_page(ranked, 0, 25, False)
+    return [hit["_id"] for hit in results["hits"]["hits"]]
+
+
+def execute(search, plan):
+    took, response = 0, None
+    while True:
+        try:
+            request = plan.send(response)
+        except StopIteration as e:
+            return e.value, took
+        response = search._search_all({0: request})[0]
+        took += response["took"]
+
+
+def measure(search, ingredients, sort, ranking, repeat):
+    query, sort_params = search._render_query(
+        ingredients=ingredients,
+        dietary_properties=[],
+        sort=sort,
+        exact_match=False,
+    )
+
+    took, elapsed = [], []
+    for _ in range(repeat):
+        start = perf_counter()
+        plan = first_page(search, query, sort_params, ranking)
+        ids, search_took = execute(search, plan)
+        elapsed.append((perf_counter() - start) * 1000)
+        took.append(search_took)
+    return ids, took, elapsed
+
+
+def percentile(values, n):
+    return quantiles(values, n=100)[n - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("searches", nargs="*", default=DEFAULT_SEARCHES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--sort", choices=RecipeSearch.SORT_SCRIPTS, default=None)
+    args = parser.parse_args()
+
+    search = RecipeSearch()
+    print("search\tmode\ttook_p50\ttook_p95\twall_p50\ttop25_overlap")
+    for ingredients in args.searches:
+        clauses = EntityClause.from_args(ingredients.split(","))
+        baseline = None
+        for ranking in RecipeSearch.RANKING_MODES:
+            ids, took, elapsed = measure(
+                search, clauses, args.sort, ranking, args.repeat
+            )
+            baseline = baseline if baseline is not None else ids
+            overlap = len(set(ids) & set(baseline)) / max(len(baseline), 1)
+            print(
+                f"{ingredients}\t{ranking}"
+                f"\t{median(took):.1f}\t{percentile(took, 95):.1f}"
+                f"\t{median(elapsed):.1f}\t{overlap:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
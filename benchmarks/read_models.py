@@ -0,0 +1,70 @@
+"""
+Compare the persistence models and the slotted read models that represent
+recipe search hits, reporting the time taken to construct and serialize
+each recipe, and the memory retained by a page of constructed recipes.
+
+Usage:
+
+    python -m benchmarks.read_models [--repeat N] [--ingredients N]
+
+The recipe document is generated locally, and is filtered to the source
+fields that the search path requests; no search cluster is required.
+"""
+
+import argparse
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+from benchmarks.projection import project, recipe_document
+from reciperadar.models.recipes import Recipe
+from reciperadar.models.recipes.views import RecipeView
+from reciperadar.search.base import EntityClause
+
+MODELS = {
+    "orm": Recipe,
+    "view": RecipeView,
+}
+
+
+def timings(model, doc, ingredients, repeat):
+    construct, serialize = [], []
+    for _ in range(repeat):
+        start = perf_counter()
+        recipe = model.from_doc(doc)
+        constructed = perf_counter()
+        recipe.to_dict(ingredients)
+        serialized = perf_counter()
+        construct.append((constructed - start) * 1000)
+        serialize.append((serialized - constructed) * 1000)
+    return median(construct), median(serialize)
+
+
+def retained_memory(model, doc, count):
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    recipes = [model.from_doc(doc) for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del recipes
+    return (current - baseline) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--ingredients", type=int, default=12)
+    args = parser.parse_args()
+
+    doc = project(recipe_document(args.ingredients), Recipe.SOURCE_FIELDS)
+    ingredients = EntityClause.from_args(["ingredient 0", "ingredient 1"])
+
+    print("model\tconstruct_p50_ms\tto_dict_p50_ms\tbytes_per_recipe")
+    for name, model in MODELS.items():
+        construct, serialize = timings(model, doc, ingredients, args.repeat)
+        memory = retained_memory(model, doc, count=25)
+        print(f"{name}\t{construct:.3f}\t{serialize:.3f}\t{memory:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,24 @@ from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from reciperadar.utils.fragments import FragmentJSONProvider
+
 
 app = Flask(__name__)
+app.json = FragmentJSONProvider(app)
 app.config.update(
     MAIL_SERVER="smtp.gmail.com",
     MAIL_PORT=587,
     MAIL_USE_TLS=True,
     MAIL_USERNAME=os.environ.get("MAIL_USERNAME"),
     MAIL_PASSWORD=os.environ.get("MAIL_PASSWORD"),
+    RERANK_CANDIDATES=int(os.environ.get("RERANK_CANDIDATES", 25 * 10)),
+    RESCORE_WINDOW=int(os.environ.get("RESCORE_WINDOW", 25 * 10)),
+    SEARCH_RANKING=os.environ.get("SEARCH_RANKING", "script"),
+    SHARED_SEGMENT_DIR=os.environ.get("SHARED_SEGMENT_DIR", "/var/tmp"),
     SQLALCHEMY_DATABASE_URI="sqlite://",
     SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    STREAMING_RESPONSES=os.environ.get("STREAMING_RESPONSES") == "true",
 )
 app.url_map.strict_slashes = False
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
@@ -24,6 +32,7 @@ db = SQLAlchemy(app)
 
 
 import reciperadar.api.feedback
+import reciperadar.api.metrics
 import reciperadar.api.autosuggest
 import reciperadar.api.recipes
 import reciperadar.api.redirect
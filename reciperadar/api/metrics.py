@@ -0,0 +1,9 @@
+from flask import Response
+
+from reciperadar import app
+from reciperadar.utils.metrics import metrics
+
+
+@app.route("/metrics")
+def metrics_export():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,6 +1,8 @@
 import sys
 
 from flask import abort, jsonify, request
+from opensearchpy.exceptions import NotFoundError
+from werkzeug.datastructures import MultiDict
 
 from reciperadar import app
 from reciperadar.models.feedback import (
@@ -11,16 +13,28 @@ from reciperadar.models.feedback import (
     UnsafeContent,
 )
 from reciperadar.models.recipes import Recipe
+from reciperadar.models.recipes.fragments import render_recipe
 from reciperadar.search.base import EntityClause
-from reciperadar.search.recipes import RecipeSearch
+from reciperadar.search.recipes import RecipeSearch, SearchCursor
 from reciperadar.utils.bots import is_suspected_bot
+from reciperadar.utils.streaming import json_response
 from reciperadar.workers.events import store_event
 from reciperadar.workers.searches import recrawl_search
 
 
+def fields_arg(args):
+    # Sparse fieldsets are requested as a comma-separated list of field names
+    fields = [field for field in args.get("fields", "").split(",") if field]
+    if not set(fields) <= Recipe.RESPONSE_FIELDS.keys():
+        return abort(400)
+    return fields or None
+
+
 @app.route("/recipes/<recipe_id>/view")
 def recipe_view(recipe_id):
-    recipe = Recipe().get_by_id(recipe_id)
+    fields = fields_arg(request.args)
+    source = Recipe.source_fields(fields) + ["redirected_id"] if fields else None
+    recipe = Recipe().get_by_id(recipe_id, source=source)
     if not recipe:
         return abort(404)
 
@@ -33,7 +47,14 @@ def recipe_view(recipe_id):
 
     results = {
         "total": 1,
-        "results": [recipe.to_dict()],
+        "results": [
+            render_recipe(
+                recipe_id=recipe.id,
+                indexed_at=recipe.indexed_at,
+                load=lambda: recipe,
+                fields=fields,
+            )
+        ],
     }
     return jsonify(results)
 
@@ -52,99 +73,206 @@ def dietary_args(args):
     ]
 
 
-@app.route("/recipes/search")
-def recipe_search():
-    ingredients = EntityClause.from_args(request.args.getlist("ingredients[]"))
-    equipment = EntityClause.from_args(request.args.getlist("equipment[]"))
-    offset = min(request.args.get("offset", type=int, default=0), (25 * 10) - 10)
-    limit = min(request.args.get("limit", type=int, default=10), 10)
-    sort = request.args.get("sort", type=str)
-    domains = EntityClause.from_args(request.args.getlist("domains[]"))
-    dietary_properties = EntityClause.from_args(dietary_args(request.args))
-
-    if sort and sort not in RecipeSearch.sort_methods():
+def search_params(args):
+    ingredients = EntityClause.from_args(args.getlist("ingredients[]"))
+    equipment = EntityClause.from_args(args.getlist("equipment[]"))
+    offset = min(args.get("offset", type=int, default=0), (25 * 10) - 10)
+    limit = min(args.get("limit", type=int, default=10), 10)
+    sort = args.get("sort", type=str)
+    domains = EntityClause.from_args(args.getlist("domains[]"))
+    dietary_properties = EntityClause.from_args(dietary_args(args))
+    ranking = args.get("ranking", type=str, default=app.config["SEARCH_RANKING"])
+    facets = args.get("facets", type=str, default="true")
+
+    if sort and sort not in RecipeSearch.SORT_SCRIPTS:
+        return abort(400)
+    if ranking not in RecipeSearch.RANKING_MODES:
         return abort(400)
+    if facets not in {"true", "false"}:
+        return abort(400)
+
+    params = {
+        "ingredients": ingredients,
+        "equipment": equipment,
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "domains": domains,
+        "dietary_properties": dietary_properties,
+        "ranking": ranking,
+        "facets": facets == "true",
+        "fields": fields_arg(args),
+    }
+
+    # Cursor paging begins with an empty cursor, and is not capped by offset
+    if "cursor" in args:
+        cursor = args.get("cursor", type=str)
+        if cursor:
+            try:
+                SearchCursor.decode(cursor)
+            except ValueError:
+                return abort(400)
+        params["cursor"] = cursor
+
+    return params
 
-    results = RecipeSearch().query(
+
+def explore_params(args):
+    ingredients = EntityClause.from_args(args.getlist("ingredients[]"))
+    dietary_properties = EntityClause.from_args(dietary_args(args))
+    return RecipeSearch.explore_params(
         ingredients=ingredients,
-        equipment=equipment,
-        offset=offset,
-        limit=limit,
-        sort=sort,
-        domains=domains,
         dietary_properties=dietary_properties,
+        fields=fields_arg(args),
     )
 
-    user_agent = request.headers.get("user-agent")
-    suspected_bot = is_suspected_bot(user_agent)
 
-    include = EntityClause.term_list(ingredients, lambda x: x.positive)
-    exclude = EntityClause.term_list(ingredients, lambda x: x.negative)
-    dietary_properties = EntityClause.term_list(dietary_properties)
+def record_search(path, params, results, suspected_bot):
+    include = EntityClause.term_list(params["ingredients"], lambda x: x.positive)
+    exclude = EntityClause.term_list(params["ingredients"], lambda x: x.negative)
+    dietary_properties = EntityClause.term_list(params["dietary_properties"])
 
     # Perform a recrawl for the search to find any new/missing recipes
     if not suspected_bot:
-        recrawl_search.delay(include, exclude, [], dietary_properties, offset)
+        recrawl_search.delay(include, exclude, [], dietary_properties, params["offset"])
 
     # Log a search event
     store_event.delay(
         event_table="searches",
         event_data={
             "suspected_bot": suspected_bot,
-            "path": request.path,
+            "path": path,
             "include": include,
             "exclude": exclude,
             "equipment": [],
             "dietary_properties": dietary_properties,
-            "offset": offset,
-            "limit": limit,
-            "sort": sort,
+            "offset": params["offset"],
+            "limit": params["limit"],
+            "sort": params["sort"],
             "results_ids": [result["id"] for result in results["results"]],
             "results_total": results["total"],
         },
     )
 
-    return jsonify(results)
-
-
-@app.route("/recipes/explore")
-def recipe_explore():
-    ingredients = EntityClause.from_args(request.args.getlist("ingredients[]"))
-    dietary_properties = EntityClause.from_args(dietary_args(request.args))
-
-    results = RecipeSearch().explore(
-        ingredients=ingredients,
-        dietary_properties=dietary_properties,
-    )
-
-    user_agent = request.headers.get("user-agent")
-    suspected_bot = is_suspected_bot(user_agent)
 
-    include = EntityClause.term_list(ingredients, lambda x: x.positive)
-    exclude = EntityClause.term_list(ingredients, lambda x: x.negative)
-    depth = len(ingredients)
-    limit = 10 if depth >= 3 else 0
+def record_explore(path, params, results, suspected_bot):
+    include = EntityClause.term_list(params["ingredients"], lambda x: x.positive)
+    exclude = EntityClause.term_list(params["ingredients"], lambda x: x.negative)
 
     # Log a search event
     store_event.delay(
         event_table="searches",
         event_data={
             "suspected_bot": suspected_bot,
-            "path": request.path,
+            "path": path,
             "include": include,
             "exclude": exclude,
             "equipment": [],
             "offset": 0,
-            "limit": limit,
+            "limit": params["limit"],
             "sort": None,
             "results_ids": [result["id"] for result in results["results"]],
             "results_total": results["total"],
         },
     )
 
+
+def search_error(params, e):
+    # the cursor is invalid, or its point-in-time snapshot has expired
+    if params.get("cursor") and isinstance(e, (NotFoundError, ValueError)):
+        return 410 if isinstance(e, NotFoundError) else 400
+    # otherwise the search engine request failed, or could not be sent
+    status = getattr(e, "status_code", None)
+    return status if isinstance(status, int) else 502
+
+
+@app.route("/recipes/search")
+def recipe_search():
+    params = search_params(request.args)
+    try:
+        results = RecipeSearch().query(**params)
+    except (NotFoundError, ValueError) as e:
+        if not params.get("cursor"):
+            raise
+        return abort(search_error(params, e))
+
+    user_agent = request.headers.get("user-agent")
+    suspected_bot = is_suspected_bot(user_agent)
+    record_search(request.path, params, results, suspected_bot)
+
+    return json_response(results)
+
+
+@app.route("/recipes/facets")
+def recipe_facets():
+    params = search_params(request.args)
+    results = RecipeSearch().facets(
+        ingredients=params["ingredients"],
+        equipment=params["equipment"],
+        sort=params["sort"],
+        domains=params["domains"],
+        dietary_properties=params["dietary_properties"],
+    )
     return jsonify(results)
 
 
+@app.route("/recipes/explore")
+def recipe_explore():
+    params = explore_params(request.args)
+    results = RecipeSearch().query(**params)
+
+    user_agent = request.headers.get("user-agent")
+    suspected_bot = is_suspected_bot(user_agent)
+    record_explore(request.path, params, results, suspected_bot)
+
+    return json_response(results)
+
+
+def batch_args(args):
+    # Each batch argument is given as a query string value, or a list of them
+    if not isinstance(args, dict):
+        return abort(400)
+    for value in args.values():
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(value, str) for value in values):
+            return abort(400)
+    return MultiDict(args)
+
+
+@app.route("/recipes/batch", methods=["POST"])
+def recipe_batch():
+    batch = request.get_json(silent=True)
+    if not isinstance(batch, list) or not (1 <= len(batch) <= 10):
+        return abort(400)
+
+    searches = []
+    for item in batch:
+        if not isinstance(item, dict):
+            return abort(400)
+        args = batch_args(item.get("args", {}))
+        match item.get("endpoint"):
+            case "search":
+                searches.append(("/recipes/search", search_params(args)))
+            case "explore":
+                searches.append(("/recipes/explore", explore_params(args)))
+            case _:
+                return abort(400)
+
+    batch_results = RecipeSearch().multi_query([params for _, params in searches])
+
+    user_agent = request.headers.get("user-agent")
+    suspected_bot = is_suspected_bot(user_agent)
+    for idx, ((path, params), results) in enumerate(zip(searches, batch_results)):
+        # Each failed search is reported by its own status code
+        if isinstance(results, Exception):
+            batch_results[idx] = {"status": search_error(params, results)}
+            continue
+        record = record_search if path == "/recipes/search" else record_explore
+        record(path, params, results, suspected_bot)
+
+    return jsonify(batch_results)
+
+
 @app.route("/recipes/report", methods=["POST"])
 def recipe_report():
     try:
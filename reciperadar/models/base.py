@@ -29,9 +29,10 @@ class Searchable:
     def noun(self):
         pass
 
-    def get_by_id(self, id):
+    def get_by_id(self, id, source=None):
+        params = {"_source_includes": source} if source else {}
         try:
-            doc = self.es.get(index=self.noun, id=id)
+            doc = self.es.get(index=self.noun, id=id, **params)
         except NotFoundError:
             return None
         return self.from_doc(doc["_source"])
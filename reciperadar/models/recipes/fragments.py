@@ -0,0 +1,134 @@
+import json
+from collections.abc import Mapping
+
+from reciperadar import app
+from reciperadar.models.recipes.product import Product
+from reciperadar.search.base import MatchContext
+from reciperadar.utils.cache import ResultCache
+from reciperadar.utils.fragments import JSONFragment
+from reciperadar.utils.metrics import metrics
+
+
+class RecipeTemplate:
+    """
+    The JSON encoding of a recipe's response representation, split around
+    the product states; those depend on the query ingredients, and are
+    inserted each time that the template is rendered.
+    """
+
+    __slots__ = ("segments", "contents", "size")
+
+    STATE = "\x00state\x00"
+
+    def __init__(self, segments, contents):
+        self.segments = segments
+        self.contents = contents
+        self.size = sum(len(segment) for segment in segments)
+
+    @staticmethod
+    def encode(recipe, fields=None):
+        doc = recipe.to_dict(fields=fields)
+        ingredients = doc.get("ingredients", [])
+        for ingredient in ingredients:
+            ingredient["product"]["state"] = RecipeTemplate.STATE
+        text = app.json.dumps(doc, separators=(",", ":"))
+
+        # Recipe content that contains the placeholder itself is not templated
+        segments = text.split(app.json.dumps(RecipeTemplate.STATE))
+        if len(segments) != len(ingredients) + 1:
+            return None
+        contents = [
+            ingredient.product.contents or ()
+            for ingredient in (recipe.ingredients if ingredients else [])
+        ]
+        return RecipeTemplate(segments, contents)
+
+    def render(self, match):
+        states = {
+            True: json.dumps(Product.STATE_AVAILABLE),
+            False: json.dumps(Product.STATE_REQUIRED),
+        }
+        parts = [self.segments[0]]
+        for contents, segment in zip(self.contents, self.segments[1:]):
+            parts += [states[match.matches(contents)], segment]
+        return "".join(parts)
+
+
+class RecipeFragment(JSONFragment, Mapping):
+    """
+    A recipe response representation rendered from a cached template; the
+    content is decoded only if it is read before the response is serialized.
+    """
+
+    __slots__ = ("id", "template", "match", "_decoded")
+
+    def __init__(self, id, template, match):
+        self.id = id
+        self.template = template
+        self.match = match
+        self._decoded = None
+
+    @property
+    def text(self):
+        return self.template.render(self.match)
+
+    def _content(self):
+        if self._decoded is None:
+            self._decoded = json.loads(self.text)
+        return self._decoded
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.id
+        return self._content()[key]
+
+    def __iter__(self):
+        return iter(self._content())
+
+    def __len__(self):
+        return len(self._content())
+
+
+fragment_cache = ResultCache(
+    maxsize=64 * 1024 * 1024,
+    ttl=3600,
+    sizeof=lambda template: template.size,
+)
+
+
+def fragment_hit_ratio():
+    hits = metrics.value("recipe_fragment_requests_total", {"result": "hit"})
+    misses = metrics.value("recipe_fragment_requests_total", {"result": "miss"})
+    return hits / (hits + misses) if hits + misses else 0
+
+
+metrics.gauge("recipe_fragment_hit_ratio", fragment_hit_ratio)
+
+
+def render_recipe(recipe_id, indexed_at, load, ingredients=None, fields=None):
+    """
+    Produce the response representation of a recipe, reusing its encoded
+    template while the indexed recipe is unchanged; `load` is called to
+    retrieve the recipe model only when no template is cached
+
+    Each sparse fieldset of a recipe is templated separately
+    """
+    match = MatchContext.of(ingredients)
+    fields = tuple(sorted(fields)) if fields else None
+    key = (recipe_id, indexed_at, fields) if indexed_at else None
+    template = fragment_cache.get(key) if key else None
+    if template:
+        metrics.increment("recipe_fragment_requests_total", {"result": "hit"})
+        metrics.increment("recipe_fragment_bytes_saved_total", value=template.size)
+        return RecipeFragment(recipe_id, template, match)
+
+    recipe = load()
+    if not key:
+        return recipe.to_dict(match, fields)
+
+    metrics.increment("recipe_fragment_requests_total", {"result": "miss"})
+    template = RecipeTemplate.encode(recipe, fields)
+    if not template:
+        return recipe.to_dict(match, fields)
+    fragment_cache.set(key, template)
+    return RecipeFragment(recipe_id, template, match)
@@ -1,6 +1,7 @@
 from reciperadar import db
 from reciperadar.models.base import Storable
 from reciperadar.models.recipes.product import Product
+from reciperadar.search.base import MatchContext
 
 
 class RecipeIngredient(Storable):
@@ -27,6 +28,17 @@ class RecipeIngredient(Storable):
     product_parser = db.Column(db.String)
     verb = db.Column(db.String)
 
+    # search document fields required to produce the response representation
+    SOURCE_FIELDS = [
+        "id",
+        "index",
+        "description",
+        "markup",
+        "magnitude",
+        "units",
+        "product_is_plural",
+    ] + [f"product.{field}" for field in Product.SOURCE_FIELDS]
+
     @property
     def product_name(self):
         if self.product_is_plural:
@@ -53,6 +65,7 @@ class RecipeIngredient(Storable):
         )
 
     def to_dict(self, ingredients=None):
+        ingredients = MatchContext.of(ingredients)
         return {
             "markup": self.markup,
             "product": {
@@ -17,6 +17,20 @@ class Nutrition(Storable):
     protein = db.Column(db.Float)
     protein_units = db.Column(db.String)
 
+    # search document fields required to produce the response representation
+    SOURCE_FIELDS = [
+        "carbohydrates",
+        "carbohydrates_units",
+        "energy",
+        "energy_units",
+        "fat",
+        "fat_units",
+        "fibre",
+        "fibre_units",
+        "protein",
+        "protein_units",
+    ]
+
     def to_dict(self):
         return {
             "carbohydrates": {
@@ -2,7 +2,7 @@ from sqlalchemy.dialects import postgresql
 
 from reciperadar import db
 from reciperadar.models.base import Storable
-from reciperadar.search.base import EntityClause
+from reciperadar.search.base import MatchContext
 
 
 class Product(Storable):
@@ -21,6 +21,9 @@ class Product(Storable):
     STATE_AVAILABLE = "available"
     STATE_REQUIRED = "required"
 
+    # search document fields required to produce the response representation
+    SOURCE_FIELDS = ["id", "category", "singular", "plural", "contents"]
+
     @staticmethod
     def from_doc(doc):
         return Product(
@@ -33,14 +36,10 @@ class Product(Storable):
         )
 
     def state(self, ingredients):
-        ingredients = ingredients or []
-        states = {
-            True: Product.STATE_AVAILABLE,
-            False: Product.STATE_REQUIRED,
-        }
-        include = EntityClause.term_list(ingredients, lambda x: x.positive)
-        available = bool(set(self.contents or []) & set(include))
-        return states[available]
+        match = MatchContext.of(ingredients)
+        if match.matches(self.contents):
+            return Product.STATE_AVAILABLE
+        return Product.STATE_REQUIRED
 
     def to_dict(self, ingredients):
         return {
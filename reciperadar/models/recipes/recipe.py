@@ -2,6 +2,7 @@ from reciperadar import db
 from reciperadar.models.base import Searchable, Storable
 from reciperadar.models.recipes.ingredient import RecipeIngredient
 from reciperadar.models.recipes.nutrition import RecipeNutrition
+from reciperadar.search.base import MatchContext
 
 
 class Recipe(Storable, Searchable):
@@ -31,6 +32,42 @@ class Recipe(Storable, Searchable):
     redirected_id = db.Column(db.String)
     redirected_at = db.Column(db.DateTime)
 
+    # search document fields required to produce each response field
+    RESPONSE_FIELDS = {
+        "id": [],
+        "title": ["title"],
+        "time": ["time"],
+        "ingredients": [
+            f"ingredients.{field}" for field in RecipeIngredient.SOURCE_FIELDS
+        ],
+        "directions": [],
+        "servings": ["servings"],
+        "rating": ["rating"],
+        "dst": ["dst"],
+        "domain": ["domain"],
+        "author": ["author"],
+        "author_url": ["author_url"],
+        "nutrition": ["nutrition_source"]
+        + [f"nutrition.{field}" for field in RecipeNutrition.SOURCE_FIELDS],
+        "is_dairy_free": ["is_dairy_free"],
+        "is_gluten_free": ["is_gluten_free"],
+        "is_vegan": ["is_vegan"],
+        "is_vegetarian": ["is_vegetarian"],
+    }
+
+    # search document fields required to produce the response representation
+    SOURCE_FIELDS = ["id", "indexed_at"] + [
+        source for sources in RESPONSE_FIELDS.values() for source in sources
+    ]
+
+    @staticmethod
+    def source_fields(fields=None):
+        if not fields:
+            return Recipe.SOURCE_FIELDS
+        return ["id", "indexed_at"] + [
+            source for field in fields for source in Recipe.RESPONSE_FIELDS[field]
+        ]
+
     @property
     def noun(self):
         return "recipes"
@@ -58,15 +95,15 @@ class Recipe(Storable, Searchable):
     def from_doc(doc):
         return Recipe(
             id=doc["id"],
-            title=doc["title"],
-            src=doc["src"],
-            dst=doc["dst"],
-            domain=doc["domain"],
+            title=doc.get("title"),
+            src=doc.get("src"),
+            dst=doc.get("dst"),
+            domain=doc.get("domain"),
             author=doc.get("author"),
             author_url=doc.get("author_url"),
             ingredients=[
                 RecipeIngredient.from_doc(ingredient)
-                for ingredient in doc["ingredients"]
+                for ingredient in doc.get("ingredients", [])
                 if ingredient["description"].strip()
             ],
             nutrition=(
@@ -79,16 +116,18 @@ class Recipe(Storable, Searchable):
             is_gluten_free=doc.get("is_gluten_free"),
             is_vegan=doc.get("is_vegan"),
             is_vegetarian=doc.get("is_vegetarian"),
-            servings=doc["servings"],
-            time=doc["time"],
-            rating=doc["rating"],
-            indexed_at=doc["indexed_at"],
+            servings=doc.get("servings"),
+            time=doc.get("time"),
+            rating=doc.get("rating"),
+            indexed_at=doc.get("indexed_at"),
             redirected_id=doc.get("redirected_id"),
             redirected_at=doc.get("redirected_at"),
         )
 
-    def to_dict(self, ingredients=None):
-        return {
+    def to_dict(self, ingredients=None, fields=None):
+        # prepare the query ingredients once for every product in the recipe
+        ingredients = MatchContext.of(ingredients)
+        doc = {
             "id": self.id,
             "title": self.title,
             "time": self.time,
@@ -116,3 +155,12 @@ class Recipe(Storable, Searchable):
             "is_vegan": self.is_vegan,
             "is_vegetarian": self.is_vegetarian,
         }
+        if not fields:
+            return doc
+
+        # a sparse fieldset always identifies the recipe that it describes
+        return {
+            field: value
+            for field, value in doc.items()
+            if field == "id" or field in fields
+        }
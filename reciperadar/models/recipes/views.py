@@ -0,0 +1,118 @@
+from reciperadar.models.recipes.ingredient import RecipeIngredient
+from reciperadar.models.recipes.nutrition import Nutrition
+from reciperadar.models.recipes.product import Product
+from reciperadar.models.recipes.recipe import Recipe
+
+
+class ReadModel:
+    """
+    A compact, read-only representation of a search document, used on the
+    request path where the full persistence model is unnecessary.
+
+    Each read model shares its response representation with the persistence
+    model that it mirrors, and so produces identical output.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+
+
+class ProductView(ReadModel):
+    __slots__ = ("id", "category", "singular", "plural", "contents")
+
+    state = Product.state
+    to_dict = Product.to_dict
+
+    @staticmethod
+    def from_doc(doc):
+        return ProductView(
+            id=doc.get("id"),
+            category=doc.get("category"),
+            singular=doc.get("singular"),
+            plural=doc.get("plural"),
+            contents=doc.get("contents"),
+        )
+
+
+class IngredientView(ReadModel):
+    __slots__ = ("markup", "product", "product_is_plural", "magnitude", "units")
+
+    product_name = RecipeIngredient.product_name
+    to_dict = RecipeIngredient.to_dict
+
+    @staticmethod
+    def from_doc(doc):
+        return IngredientView(
+            markup=doc.get("markup"),
+            product=ProductView.from_doc(doc["product"]),
+            product_is_plural=doc.get("product_is_plural"),
+            magnitude=doc.get("magnitude"),
+            units=doc.get("units"),
+        )
+
+
+class NutritionView(ReadModel):
+    __slots__ = tuple(Nutrition.SOURCE_FIELDS)
+
+    to_dict = Nutrition.to_dict
+
+    @staticmethod
+    def from_doc(doc):
+        return NutritionView(**doc)
+
+
+class RecipeView(ReadModel):
+    __slots__ = (
+        "id",
+        "title",
+        "time",
+        "ingredients",
+        "servings",
+        "rating",
+        "dst",
+        "domain",
+        "author",
+        "author_url",
+        "nutrition",
+        "nutrition_source",
+        "is_dairy_free",
+        "is_gluten_free",
+        "is_vegan",
+        "is_vegetarian",
+        "indexed_at",
+    )
+
+    to_dict = Recipe.to_dict
+
+    @staticmethod
+    def from_doc(doc):
+        return RecipeView(
+            id=doc["id"],
+            title=doc.get("title"),
+            time=doc.get("time"),
+            ingredients=[
+                IngredientView.from_doc(ingredient)
+                for ingredient in doc.get("ingredients", [])
+                if ingredient["description"].strip()
+            ],
+            servings=doc.get("servings"),
+            rating=doc.get("rating"),
+            dst=doc.get("dst"),
+            domain=doc.get("domain"),
+            author=doc.get("author"),
+            author_url=doc.get("author_url"),
+            nutrition=(
+                NutritionView.from_doc(doc["nutrition"])
+                if doc.get("nutrition")
+                else None
+            ),
+            nutrition_source=doc.get("nutrition_source"),
+            is_dairy_free=doc.get("is_dairy_free"),
+            is_gluten_free=doc.get("is_gluten_free"),
+            is_vegan=doc.get("is_vegan"),
+            is_vegetarian=doc.get("is_vegetarian"),
+            indexed_at=doc.get("indexed_at"),
+        )
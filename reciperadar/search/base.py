@@ -11,6 +11,9 @@ class EntityClause:
     def __eq__(self, obj):
         return self.term == obj.term and self.positive == obj.positive
 
+    def __hash__(self):
+        return hash((self.term, self.positive))
+
     @property
     def negative(self):
         return not self.positive
@@ -24,20 +27,83 @@ class EntityClause:
         return [EntityClause.from_arg(arg) for arg in args]
 
     @staticmethod
-    def term_list(clauses, condition=lambda x: True, synonyms=None):
+    def term_groups(clauses, condition=lambda x: True, synonyms=None):
         synonyms = synonyms or {}
         seen = set()
-        terms = []
+        groups = []
         for clause in filter(condition, clauses):
+            group = []
             for expansion in synonyms.get(clause.term) or [clause.term]:
                 if expansion in seen:
                     continue
                 seen.add(expansion)
-                terms.append(expansion)
-        return terms
+                group.append(expansion)
+            if group:
+                groups.append(group)
+        return groups
+
+    @staticmethod
+    def term_list(clauses, condition=lambda x: True, synonyms=None):
+        groups = EntityClause.term_groups(clauses, condition, synonyms)
+        return [term for group in groups for term in group]
+
+
+class MatchContext:
+    """
+    The ingredients included by a search query, prepared once per request so
+    that each product in the results can be matched with a single lookup.
+    """
+
+    __slots__ = ("include",)
+
+    def __init__(self, include):
+        self.include = frozenset(include)
+
+    @staticmethod
+    def of(ingredients, synonyms=None):
+        if isinstance(ingredients, MatchContext):
+            return ingredients
+        include = EntityClause.term_list(
+            ingredients or [], lambda x: x.positive, synonyms
+        )
+        return MatchContext(include)
+
+    def matches(self, contents):
+        return not self.include.isdisjoint(contents or ())
 
 
 class QueryRepository:
     __metaclass__ = ABC
 
     es = OpenSearch("opensearch")
+
+    def index_generation(self, index):
+        # Identify the concrete index (or indices) that an index name refers
+        # to; this changes whenever the index is rebuilt and re-aliased
+        settings = self.es.indices.get_settings(index=index, name="index.uuid")
+        return frozenset(
+            (name, content["settings"]["index"]["uuid"])
+            for name, content in settings.items()
+        )
+
+    def composite_buckets(self, index, query, path):
+        """
+        Retrieve every bucket of the composite aggregation found by following
+        the `path` of aggregation names within `query`, one page of buckets
+        at a time; a partial result is discarded, and None is returned
+        """
+        aggregation = query
+        for name in path:
+            aggregation = aggregation["aggregations"][name]
+        buckets = []
+        try:
+            while True:
+                results = self.es.search(index=index, body=query)["aggregations"]
+                for name in path:
+                    results = results[name]
+                if not results["buckets"]:
+                    return buckets
+                buckets += results["buckets"]
+                aggregation["composite"]["after"] = results["after_key"]
+        except Exception:
+            return None
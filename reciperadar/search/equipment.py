@@ -1,9 +1,107 @@
+import os
+from datetime import UTC, datetime, timedelta
+from heapq import nsmallest
+
+from reciperadar import app
 from reciperadar.search.base import QueryRepository
+from reciperadar.utils.cache import PrefixCache
+from reciperadar.utils.metrics import metrics
+from reciperadar.utils.refresh import Refresher
+from reciperadar.utils.segments import SharedSegment
+from reciperadar.utils.singleflight import FlightGroup
+
+
+# Characters that have a special meaning in search engine regular expressions
+REGEX_RESERVED = set('.?+*|{}[]()"\\#@&<>~')
+
+
+def escape_regex(text):
+    return "".join(f"\\{char}" if char in REGEX_RESERVED else char for char in text)
+
+
+# Each equipment name is stored with the number of recipes that contain it
+equipment_index = SharedSegment(
+    os.path.join(app.config["SHARED_SEGMENT_DIR"], "equipment_index")
+)
+
+EQUIPMENT_REFRESH_INTERVAL = timedelta(hours=1)
+
+
+def refresh_equipment_index():
+    # Rebuild the shared equipment segment if it is missing or has expired,
+    # by the earliest jittered refresh of any worker process
+    max_age = EQUIPMENT_REFRESH_INTERVAL * (1 - equipment_refresher.jitter)
+    expiry = datetime.now(tz=UTC) - max_age
+    return equipment_index.rebuild(EquipmentSearch().equipment, expiry)
+
+
+equipment_refresher = Refresher(
+    name="equipment_index",
+    refresh=refresh_equipment_index,
+    interval=EQUIPMENT_REFRESH_INTERVAL.total_seconds(),
+    immediate=True,
+)
+
+
+def equipment_index_age():
+    loaded_at = equipment_index.loaded_at
+    if loaded_at:
+        return (datetime.now(tz=UTC) - loaded_at).total_seconds()
+
+
+metrics.gauge("equipment_index_age_seconds", equipment_index_age)
+metrics.gauge("equipment_index_size", lambda: len(equipment_index))
+
+equipment_flights = FlightGroup("equipment_autosuggest")
+
+# Equipment names are suggested when they begin with the prefix, and each is
+# counted across every recipe that contains it, so narrowing is exact
+equipment_candidates = PrefixCache(
+    name="equipment_autosuggest",
+    maxsize=10000,
+    ttl=600,
+    limit=10,
+    narrow=lambda candidates, prefix: [
+        candidate for candidate in candidates if candidate["key"].startswith(prefix)
+    ],
+)
 
 
 class EquipmentSearch(QueryRepository):
     def autosuggest(self, prefix):
         prefix = prefix.lower()
+
+        # Suggestions are retrieved from the search engine until a worker
+        # process has built the shared equipment index
+        equipment_refresher.start()
+        candidates = None
+        if equipment_index.reload():
+            candidates = self._indexed_candidates(prefix)
+        if candidates is None:
+            candidates = equipment_candidates.lookup(prefix)
+        if candidates is None:
+            candidates = equipment_flights.do(prefix, lambda: self._candidates(prefix))
+            equipment_candidates.set(prefix, candidates)
+
+        results = sorted(
+            candidates,
+            key=lambda s: (
+                s["key"] != prefix,  # exact matches first
+                not s["key"].startswith(prefix),  # prefix matches next
+                len(s["key"]),
+            ),  # sort remaining matches by length
+        )
+        return [{"equipment": result["key"]} for result in results]
+
+    @staticmethod
+    def _indexed_candidates(prefix, limit=10):
+        # Select the most common names, as the search engine would
+        matches = nsmallest(
+            limit, equipment_index.prefixed(prefix), key=lambda item: -int(item[1][0])
+        )
+        return [{"key": name, "doc_count": int(count)} for name, (count,) in matches]
+
+    def _candidates(self, prefix):
         query = {
             "aggregations": {
                 "equipment": {
@@ -19,7 +117,7 @@ class EquipmentSearch(QueryRepository):
                         "equipment": {
                             "terms": {
                                 "field": "equipment_names",
-                                "include": f"{prefix}.*",
+                                "include": f"{escape_regex(prefix)}.*",
                                 "min_doc_count": 1,
                                 "size": 10,
                             }
@@ -29,13 +127,22 @@ class EquipmentSearch(QueryRepository):
             }
         }
         results = self.es.search(index="recipes", body=query)["aggregations"]
-        results = results["equipment"]["equipment"]["buckets"]
+        return results["equipment"]["equipment"]["buckets"]
 
-        results.sort(
-            key=lambda s: (
-                s["key"] != prefix,  # exact matches first
-                not s["key"].startswith(prefix),  # prefix matches next
-                len(s["key"]),
-            ),  # sort remaining matches by length
-        )
-        return [{"equipment": result["key"]} for result in results]
+    def equipment(self):
+        # Sweep every distinct equipment name in the recipe index
+        query = {
+            "size": 0,
+            "aggregations": {
+                "equipment": {
+                    "composite": {
+                        "size": 1000,
+                        "sources": [{"name": {"terms": {"field": "equipment_names"}}}],
+                    }
+                }
+            },
+        }
+        buckets = self.composite_buckets("recipes", query, ["equipment"])
+        if buckets is None:
+            return None
+        return {bucket["key"]["name"]: [str(bucket["doc_count"])] for bucket in buckets}
@@ -1,10 +1,240 @@
-from reciperadar.models.recipes.product import Product
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from typing import NamedTuple
+
+from opensearchpy.exceptions import NotFoundError, TransportError
+from opensearchpy.helpers import scan
+
 from reciperadar.search.base import QueryRepository
+from reciperadar.utils.cache import PrefixCache, ResultCache
+from reciperadar.utils.fuzzy import FuzzyPrefixIndex, auto_fuzziness
+from reciperadar.utils.metrics import metrics
+from reciperadar.utils.refresh import Refresher
+from reciperadar.utils.singleflight import FlightGroup
+
+
+ingredient_flights = FlightGroup("ingredient_autosuggest")
+
+# Readers query the autosuggest alias, which refers to one complete index
+PRODUCT_AUTOSUGGEST_ALIAS = "product_autosuggest"
+
+PRODUCT_AUTOSUGGEST_INDEX = {
+    "settings": {
+        "number_of_shards": 1,
+        "analysis": {
+            "filter": {
+                "autocomplete": {"type": "edge_ngram", "min_gram": 1, "max_gram": 20}
+            },
+            "analyzer": {
+                "autocomplete": {
+                    "type": "custom",
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "autocomplete"],
+                }
+            },
+        },
+    },
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "category": {"type": "keyword"},
+            "singular": {"type": "keyword"},
+            "plural": {"type": "keyword"},
+            "doc_count": {"type": "integer"},
+            "plural_count": {"type": "integer"},
+            "names": {
+                "type": "keyword",
+                "fields": {
+                    "autocomplete": {
+                        "type": "text",
+                        "analyzer": "autocomplete",
+                        "search_analyzer": "standard",
+                    }
+                },
+            },
+        }
+    },
+}
+
+# Until the first autosuggest index is built, the absence of the alias is
+# remembered, so that fallback lookups do not query it on every request
+missing_indices = ResultCache(maxsize=10, ttl=300)
+
+# Fuzzy matches, and the ingredient counts of each product name form, can
+# differ between a prefix and its extensions; results are not narrowed
+ingredient_candidates = PrefixCache(
+    name="ingredient_autosuggest",
+    maxsize=10000,
+    ttl=600,
+    limit=10,
+)
+
+
+class ProductEntry(NamedTuple):
+    id: str
+    category: str | None
+    singular: str | None
+    plural: str | None
+    doc_count: int
+    plural_count: int
+
+    @property
+    def name(self):
+        # display the singular or plural form of the product name based on
+        # how frequently each form is used in the overall recipe corpus
+        plural_wins = self.plural_count > self.doc_count - self.plural_count
+        return self.plural if plural_wins else self.singular
+
+
+class ProductDictionary:
+    """
+    An in-process dictionary of the products that appear in recipes, which
+    answers ingredient autosuggest lookups without a search request.
+
+    A product matches a lookup when its singular or plural name begins with
+    the lookup text, or when each word of the lookup begins a word of the
+    product name, allowing for typing errors as the search engine would.
+    """
+
+    MIN_DOC_COUNT = 5
+
+    def __init__(self):
+        self._state = None
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._state[0]) if self._state else 0
+
+    def load(self, products):
+        # Products are ordered by the number of ingredients that contain them
+        products = sorted(
+            (
+                product
+                for product in products
+                if product.singular and product.doc_count >= self.MIN_DOC_COUNT
+            ),
+            key=lambda product: (-product.doc_count, product.id),
+        )
+        names = sorted(
+            (name, idx)
+            for idx, product in enumerate(products)
+            for name in {product.singular, product.plural}
+            if name
+        )
+        words = defaultdict(set)
+        for name, idx in names:
+            for word in name.split():
+                words[word].add(idx)
+
+        # Readers use either the previous or the replacement state, entirely
+        self._state = products, names, words, FuzzyPrefixIndex(words)
+        self.loaded_at = datetime.now(tz=UTC)
+
+    def lookup(self, prefix, limit=10):
+        if not self._state:
+            return None
+        products, names, words, index = self._state
+
+        matches = set()
+        position = bisect_left(names, (prefix,))
+        while position < len(names) and names[position][0].startswith(prefix):
+            matches.add(names[position][1])
+            position += 1
+
+        terms = prefix.split()
+        candidates = None
+        for term in terms:
+            found = index.search(term, auto_fuzziness(term))
+            found = {idx for word in found for idx in words[word]}
+            candidates = found if candidates is None else candidates & found
+        matches |= candidates or set()
+
+        return [products[idx] for idx in sorted(matches)[:limit]]
+
+
+product_dictionary = ProductDictionary()
+
+PRODUCT_REFRESH_INTERVAL = timedelta(hours=1)
+
+
+def refresh_product_dictionary():
+    # The dictionary is loaded from the compact product autosuggest index;
+    # until that index is first built, suggestions use the search engine
+    products = IngredientSearch().indexed_products()
+    if products:
+        product_dictionary.load(products)
+
+
+product_refresher = Refresher(
+    name="product_dictionary",
+    refresh=refresh_product_dictionary,
+    interval=PRODUCT_REFRESH_INTERVAL.total_seconds(),
+    immediate=True,
+)
+
+
+def product_dictionary_age():
+    loaded_at = product_dictionary.loaded_at
+    if loaded_at:
+        return (datetime.now(tz=UTC) - loaded_at).total_seconds()
+
+
+metrics.gauge("product_dictionary_age_seconds", product_dictionary_age)
+metrics.gauge("product_dictionary_size", lambda: len(product_dictionary))
 
 
 class IngredientSearch(QueryRepository):
     def autosuggest(self, prefix):
         prefix = prefix.lower()
+
+        # The product dictionary is loaded in the background; until then,
+        # suggestions are retrieved from the search engine
+        product_refresher.start()
+        products = product_dictionary.lookup(prefix)
+        if products is not None:
+            return self._suggestions(products, prefix)
+
+        products = ingredient_candidates.lookup(prefix)
+        if products is None:
+            products = ingredient_flights.do(prefix, lambda: self._products(prefix))
+            ingredient_candidates.set(prefix, products)
+        return self._suggestions(products, prefix)
+
+    def _products(self, prefix):
+        query = {
+            "query": {
+                "bool": {
+                    "should": [
+                        {
+                            "match": {
+                                "names.autocomplete": {
+                                    "query": prefix,
+                                    "operator": "AND",
+                                    "fuzziness": "AUTO",
+                                }
+                            }
+                        },
+                        {"prefix": {"names": prefix}},
+                    ]
+                }
+            },
+            # retrieve the products that appear in the most recipe ingredients
+            "sort": [{"doc_count": "desc"}, {"id": "asc"}],
+            "size": 10,
+            "_source": list(ProductEntry._fields),
+        }
+        if missing_indices.get(PRODUCT_AUTOSUGGEST_ALIAS):
+            return self._aggregated_products(prefix)
+        try:
+            results = self.es.search(index=PRODUCT_AUTOSUGGEST_ALIAS, body=query)
+        except NotFoundError:
+            # The autosuggest index has not been built yet
+            missing_indices.set(PRODUCT_AUTOSUGGEST_ALIAS, True)
+            return self._aggregated_products(prefix)
+        return [ProductEntry(**hit["_source"]) for hit in results["hits"]["hits"]]
+
+    def _aggregated_products(self, prefix):
         query = {
             "aggregations": {
                 # aggregate across all nested ingredient documents
@@ -41,35 +271,7 @@ class IngredientSearch(QueryRepository):
                                         "min_doc_count": 5,
                                         "size": 10,
                                     },
-                                    "aggregations": {
-                                        # count products that were plural in the source recipe  # noqa
-                                        "plurality": {
-                                            "filter": {
-                                                "match": {
-                                                    "ingredients.product_is_plural": True  # noqa
-                                                }
-                                            }
-                                        },
-                                        # retrieve a category for each ingredient
-                                        "category": {
-                                            "terms": {
-                                                "field": "ingredients.product.category",
-                                                "size": 1,
-                                            }
-                                        },
-                                        "singular": {
-                                            "terms": {
-                                                "field": "ingredients.product.singular",
-                                                "size": 1,
-                                            }
-                                        },
-                                        "plural": {
-                                            "terms": {
-                                                "field": "ingredients.product.plural",
-                                                "size": 1,
-                                            }
-                                        },
-                                    },
+                                    "aggregations": self._product_aggregations(),
                                 }
                             },
                         }
@@ -80,30 +282,34 @@ class IngredientSearch(QueryRepository):
         results = self.es.search(index="recipes", body=query)["aggregations"]
         results = results["ingredients"]["products"]["product_id"]["buckets"]
 
-        # iterate through the suggestions and determine whether to display
-        # the singular or plural form of the word based on how frequently
-        # each form is used in the overall recipe corpus
-        suggestions = []
-        for result in results:
-            total_count = result["doc_count"]
-            plural_count = result["plurality"]["doc_count"]
-            plural_wins = plural_count > total_count - plural_count
-
-            product_id = result["key"]
-            category = (result["category"]["buckets"] or [{}])[0].get("key")
-            singular = (result["singular"]["buckets"] or [{}])[0].get("key")
-            plural = (result["plural"]["buckets"] or [{}])[0].get("key")
-
-            product = Product(
-                id=product_id,
-                category=category,
-                singular=singular,
-                plural=plural,
-            )
-            product.name = plural if plural_wins else singular
-            suggestions.append(product)
+        return [self._product_entry(result["key"], result) for result in results]
 
-        suggestions.sort(
+    @staticmethod
+    def _product_aggregations():
+        return {
+            # count products that were plural in the source recipe
+            "plurality": {"filter": {"match": {"ingredients.product_is_plural": True}}},
+            # retrieve a category for each ingredient
+            "category": {"terms": {"field": "ingredients.product.category", "size": 1}},
+            "singular": {"terms": {"field": "ingredients.product.singular", "size": 1}},
+            "plural": {"terms": {"field": "ingredients.product.plural", "size": 1}},
+        }
+
+    @staticmethod
+    def _product_entry(product_id, result):
+        return ProductEntry(
+            id=product_id,
+            category=(result["category"]["buckets"] or [{}])[0].get("key"),
+            singular=(result["singular"]["buckets"] or [{}])[0].get("key"),
+            plural=(result["plural"]["buckets"] or [{}])[0].get("key"),
+            doc_count=result["doc_count"],
+            plural_count=result["plurality"]["doc_count"],
+        )
+
+    @staticmethod
+    def _suggestions(products, prefix):
+        suggestions = sorted(
+            products,
             key=lambda s: (
                 s.name != prefix,  # exact matches first
                 not s.name.startswith(prefix),  # prefix matches next
@@ -121,12 +327,110 @@ class IngredientSearch(QueryRepository):
             for suggestion in suggestions
         ]
 
+    def products(self):
+        # Sweep every distinct product in the recipe index
+        aggregation = {
+            "composite": {
+                "size": 1000,
+                "sources": [
+                    {"product_id": {"terms": {"field": "ingredients.product.id"}}}
+                ],
+            },
+            "aggregations": self._product_aggregations(),
+        }
+        query = {
+            "size": 0,
+            "aggregations": {
+                "ingredients": {
+                    "nested": {"path": "ingredients"},
+                    "aggregations": {"products": aggregation},
+                }
+            },
+        }
+        buckets = self.composite_buckets("recipes", query, ["ingredients", "products"])
+        if buckets is None:
+            return None
+        return [
+            self._product_entry(bucket["key"]["product_id"], bucket)
+            for bucket in buckets
+        ]
+
+    def build_autosuggest_index(self):
+        """
+        Build a new product autosuggest index from a sweep of the recipe
+        index, and then switch the autosuggest alias to refer to it; readers
+        of the alias find either the previous index or the complete new one
+        """
+        products = self.products()
+        if products is None:
+            return None
+
+        index = f"{PRODUCT_AUTOSUGGEST_ALIAS}-{datetime.now(tz=UTC):%Y%m%d%H%M%S%f}"
+        self.es.indices.create(index=index, body=PRODUCT_AUTOSUGGEST_INDEX)
+        try:
+            self._index_products(index, products)
+            self.es.indices.refresh(index=index)
+            previous = self._aliased_indices(PRODUCT_AUTOSUGGEST_ALIAS)
+            actions = [
+                {"remove": {"index": name, "alias": PRODUCT_AUTOSUGGEST_ALIAS}}
+                for name in previous
+            ]
+            actions.append(
+                {"add": {"index": index, "alias": PRODUCT_AUTOSUGGEST_ALIAS}}
+            )
+            self.es.indices.update_aliases(body={"actions": actions})
+        except Exception:
+            self.es.indices.delete(index=index)
+            raise
+
+        for name in previous:
+            self.es.indices.delete(index=name)
+        return index
+
+    def _index_products(self, index, products, chunk_size=1000):
+        products = [
+            product
+            for product in products
+            if product.singular and product.doc_count >= ProductDictionary.MIN_DOC_COUNT
+        ]
+        for offset in range(0, len(products), chunk_size):
+            body = []
+            for product in products[offset:][:chunk_size]:
+                names = sorted({product.singular, product.plural} - {None})
+                body += [
+                    {"index": {"_id": product.id}},
+                    {**product._asdict(), "names": names},
+                ]
+            response = self.es.bulk(index=index, body=body)
+            if response["errors"]:
+                raise TransportError(500, "bulk_index_failure", response)
+
+    def indexed_products(self):
+        # Page through the product autosuggest index; a partial result is
+        # discarded
+        query = {"_source": list(ProductEntry._fields)}
+        try:
+            return [
+                ProductEntry(**result["_source"])
+                for result in scan(
+                    self.es, index=PRODUCT_AUTOSUGGEST_ALIAS, query=query, size=1000
+                )
+            ]
+        except Exception:
+            return None
+
+    def _aliased_indices(self, alias):
+        try:
+            return list(self.es.indices.get_alias(name=alias))
+        except NotFoundError:
+            return []
+
     def synonyms(self):
+        # Page through the entire synonym index; a partial result is discarded
         try:
-            results = self.es.search(index="product_synonyms", size=10000)
+            return {
+                result["_id"]: result["_source"]["synonyms"]
+                for result in scan(self.es, index="product_synonyms", size=1000)
+            }
         except Exception:
             return None
-        return {
-            result["_id"]: result["_source"]["synonyms"]
-            for result in results["hits"]["hits"]
-        }
@@ -1,62 +1,238 @@
+import json
+import os
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import defaultdict
 from datetime import UTC, datetime, timedelta
+from hashlib import sha256
+from typing import NamedTuple
+
+import numpy as np
+from opensearchpy.exceptions import HTTP_EXCEPTIONS, NotFoundError, TransportError
 
 from reciperadar import app
 from reciperadar.models.recipes import Recipe
-from reciperadar.search.base import EntityClause, QueryRepository
+from reciperadar.models.recipes.fragments import render_recipe
+from reciperadar.models.recipes.views import RecipeView
+from reciperadar.search.base import EntityClause, MatchContext, QueryRepository
 from reciperadar.search.ingredients import IngredientSearch
+from reciperadar.utils.cache import ResultCache
+from reciperadar.utils.metrics import metrics
+from reciperadar.utils.refresh import Refresher
+from reciperadar.utils.segments import SharedSegment
+from reciperadar.utils.singleflight import FlightGroup
+
+
+ingredient_synonyms = SharedSegment(
+    os.path.join(app.config["SHARED_SEGMENT_DIR"], "ingredient_synonyms")
+)
+
+SYNONYM_REFRESH_INTERVAL = timedelta(hours=1)
+
+
+def refresh_ingredient_synonyms():
+    # Rebuild the shared synonym segment if it is missing or has expired; one
+    # worker process performs the refresh while others continue to read.
+    # The segment expires by the earliest jittered refresh, so that no
+    # refresh finds it slightly too recent to rebuild
+    max_age = SYNONYM_REFRESH_INTERVAL * (1 - synonym_refresher.jitter)
+    expiry = datetime.now(tz=UTC) - max_age
+    return ingredient_synonyms.rebuild(IngredientSearch().synonyms, expiry)
+
+
+synonym_refresher = Refresher(
+    name="ingredient_synonyms",
+    refresh=refresh_ingredient_synonyms,
+    interval=SYNONYM_REFRESH_INTERVAL.total_seconds(),
+)
 
 
 def load_ingredient_synonyms():
-    # Return cached synonyms if they are available and have not yet expired
-    if hasattr(app, "ingredient_synonyms"):
-        expiry = app.ingredient_synonyms_loaded_at + timedelta(hours=1)
-        if datetime.now(tz=UTC) < expiry:
-            return app.ingredient_synonyms
-
-    # Otherwise, attempt to update the synonym cache
-    synonyms = IngredientSearch().synonyms()
-    if synonyms:
-        app.ingredient_synonyms = synonyms
-        app.ingredient_synonyms_loaded_at = datetime.now(tz=UTC)
+    # Synonyms are refreshed in the background while searches continue to
+    # read the current segment; only a missing segment is built on demand
+    synonym_refresher.start()
+    if not ingredient_synonyms.loaded_at:
+        refresh_ingredient_synonyms()
 
     # Return the latest-known synonyms
-    if hasattr(app, "ingredient_synonyms"):
-        return app.ingredient_synonyms
+    if ingredient_synonyms.reload():
+        return ingredient_synonyms
+
+
+def synonyms_age():
+    loaded_at = ingredient_synonyms.loaded_at
+    if loaded_at:
+        return (datetime.now(tz=UTC) - loaded_at).total_seconds()
+
+
+metrics.gauge("ingredient_synonyms_age_seconds", synonyms_age)
+metrics.gauge("ingredient_synonyms_size", lambda: len(ingredient_synonyms))
+
+
+def load_sort_scripts():
+    # Register the stored sort scripts when a worker first searches; if that
+    # fails, use inline scripts and retry registration after a short interval
+    checked_at = getattr(app, "sort_scripts_checked_at", None)
+    if checked_at:
+        retry_at = checked_at + timedelta(minutes=5)
+        if app.sort_scripts_stored or datetime.now(tz=UTC) < retry_at:
+            return app.sort_scripts_stored
+
+    app.sort_scripts_stored = RecipeSearch().register_sort_scripts()
+    app.sort_scripts_checked_at = datetime.now(tz=UTC)
+    return app.sort_scripts_stored
+
+
+search_cache = ResultCache(
+    maxsize=2048,
+    ttl=600,
+    generation=lambda: QueryRepository().index_generation("recipes"),
+)
+
+search_flights = FlightGroup("recipe_search")
+
+# ranked result ids for each search, shared by every page of its results
+ranking_cache = ResultCache(
+    maxsize=32 * 1024 * 1024,
+    ttl=600,
+    generation=lambda: QueryRepository().index_generation("recipes"),
+    sizeof=lambda entry: len(json.dumps(entry)),
+)
+
+CURSOR_KEEP_ALIVE = "5m"
+RANKED_RESULTS = 25 * 10
+
+
+class SearchKey(NamedTuple):
+    # ingredient order is significant because it determines match scoring
+    ingredients: tuple
+    equipment: bool
+    offset: int
+    limit: int
+    sort: str | None
+    domains: frozenset
+    dietary_properties: frozenset
+    allow_refinement: bool
+    suggest_products: bool
+    ranking: str
+    facets: bool
+    fields: tuple | None
+
+    @staticmethod
+    def from_params(
+        ingredients,
+        equipment,
+        offset,
+        limit,
+        sort,
+        domains,
+        dietary_properties,
+        allow_refinement=True,
+        suggest_products=False,
+        ranking="script",
+        facets=True,
+        fields=None,
+    ):
+        return SearchKey(
+            ingredients=tuple(ingredients),
+            equipment=bool(equipment),
+            offset=max(0, offset),
+            limit=min(25, max(0, limit)),
+            sort=sort,
+            domains=frozenset(domains),
+            dietary_properties=frozenset(dietary_properties),
+            allow_refinement=allow_refinement,
+            suggest_products=suggest_products,
+            ranking=ranking,
+            facets=facets,
+            fields=tuple(sorted(fields)) if fields else None,
+        )
+
+
+class RankedResults(NamedTuple):
+    ids: list
+    total: int
+    aggregations: dict
+    level: int
+
+
+class SearchCursor(NamedTuple):
+    # the point-in-time snapshot, the sort values of the last result returned,
+    # and the refinement level that was selected for the first page of results
+    pit_id: str
+    search_after: list
+    level: int
+
+    def encode(self):
+        content = json.dumps(self._asdict(), separators=(",", ":"))
+        return urlsafe_b64encode(content.encode()).decode()
+
+    @staticmethod
+    def decode(value):
+        try:
+            content = json.loads(urlsafe_b64decode(value.encode()))
+            cursor = SearchCursor(**content)
+        except Exception:
+            raise ValueError("Invalid search cursor")
+        if not isinstance(cursor.search_after, list) or type(cursor.level) is not int:
+            raise ValueError("Invalid search cursor")
+        return cursor
 
 
 class RecipeSearch(QueryRepository):
+    RANKING_MODES = ("script", "rescore", "rerank")
+
+    # scores are single-precision floats, representing integers exactly up to 2^24
+    MAX_ENCODED_MATCHES = 24
+
+    @staticmethod
+    def _match_boosts(count):
+        # Each term sets a distinct bit of the score; earlier terms set higher bits
+        bits = min(count, RecipeSearch.MAX_ENCODED_MATCHES)
+        return [pow(2, bits - 1 - pos) if pos < bits else 0 for pos in range(count)]
+
+    @staticmethod
+    def _match_any(field, terms):
+        # Match any of the synonym expansions for a single ingredient
+        if len(terms) == 1:
+            return {"match": {field: terms[0]}}
+        return {"bool": {"should": [{"match": {field: term}} for term in terms]}}
+
     @staticmethod
     def _generate_include_clause(ingredients):
         synonyms = load_ingredient_synonyms()
-        include = EntityClause.term_list(ingredients, lambda x: x.positive, synonyms)
+        include = EntityClause.term_groups(ingredients, lambda x: x.positive, synonyms)
+        boosts = RecipeSearch._match_boosts(len(include))
         return [
             {
                 "constant_score": {
-                    "boost": pow(10, idx),
-                    "filter": {"match": {"contents": inc}},
+                    "boost": boost,
+                    "filter": RecipeSearch._match_any("contents", terms),
                 }
             }
-            for idx, inc in enumerate(reversed(include))
+            for terms, boost in zip(include, boosts)
         ]
 
     @staticmethod
     def _generate_include_exact_clause(ingredients):
         synonyms = load_ingredient_synonyms()
-        include = EntityClause.term_list(ingredients, lambda x: x.positive, synonyms)
+        include = EntityClause.term_groups(ingredients, lambda x: x.positive, synonyms)
+        boosts = RecipeSearch._match_boosts(len(include))
         return [
             {
                 "nested": {
                     "path": "ingredients",
+                    "score_mode": "max",
                     "query": {
                         "constant_score": {
-                            "boost": pow(10, idx) * 2,
-                            "filter": {"match": {"ingredients.product.singular": inc}},
+                            "boost": boost,
+                            "filter": RecipeSearch._match_any(
+                                "ingredients.product.singular", terms
+                            ),
                         }
                     },
                 }
             }
-            for idx, inc in enumerate(reversed(include))
+            for terms, boost in zip(include, boosts)
         ]
 
     @staticmethod
@@ -72,55 +248,90 @@ class RecipeSearch(QueryRepository):
             for exc in exclude
         ]
 
+    SORT_PREAMBLE = """
+        def product_count = doc.product_count.value;
+        def found_count = Long.bitCount((long) _score);
+        def exact_found_count = params.exact ? found_count : 0;
+        def missing_count = product_count - found_count;
+        def exact_missing_count = product_count - exact_found_count;
+
+        def relevance_score = (found_count * 2 + exact_found_count);
+        def normalized_score = _score / params.score_limit;
+        def missing_score = (exact_missing_count * 2 - missing_count);
+        def missing_ratio = missing_count / product_count;
+    """
+
+    SORT_SCRIPTS = {
+        # rank: number of ingredient matches
+        # tiebreak: normalized relevance score
+        "relevance": ("relevance_score + normalized_score", "desc"),
+        # rank: number of missing ingredients
+        # tiebreak: normalized relevance score
+        "ingredients": ("missing_score + 1 - normalized_score", "asc"),
+        # rank: preparation time
+        # tiebreak: percentage of missing ingredients
+        "duration": ("doc.time.value + missing_ratio", "asc"),
+    }
+
+    # maps ascending sort values onto positive, descending scores
+    SORT_INVERSION = "value < 0 ? 2 - 1.0 / (1 - value) : 1.0 / (1 + value)"
+
     @staticmethod
-    def sort_methods(match_count=1):
-        score_limit = pow(10, match_count) * 2
-        preamble = f"""
-            def product_count = doc.product_count.value;
-            def exact_found_count = 0;
-            def found_count = 0;
-            for (def score = (long) _score; score > 0; score /= 10) {{
-                if (score % 10 > 2) exact_found_count++;
-                if (score % 10 > 0) found_count++;
-            }}
-            def missing_count = product_count - found_count;
-            def exact_missing_count = product_count - exact_found_count;
-
-            def relevance_score = (found_count * 2 + exact_found_count);
-            def normalized_score = _score / {float(score_limit)};
-            def missing_score = (exact_missing_count * 2 - missing_count);
-            def missing_ratio = missing_count / product_count;
-        """
-        return {
-            # rank: number of ingredient matches
-            # tiebreak: normalized relevance score
-            "relevance": {
-                "script": f"{preamble} relevance_score + normalized_score",
-                "order": "desc",
-            },
-            # rank: number of missing ingredients
-            # tiebreak: normalized relevance score
-            "ingredients": {
-                "script": f"{preamble} missing_score + 1 - normalized_score",
-                "order": "asc",
-            },
-            # rank: preparation time
-            # tiebreak: percentage of missing ingredients
-            "duration": {
-                "script": f"{preamble} doc.time.value + missing_ratio",
-                "order": "asc",
-            },
-        }
+    def sort_scripts():
+        scripts = {}
+        for sort, (expression, _) in RecipeSearch.SORT_SCRIPTS.items():
+            source = f"""{RecipeSearch.SORT_PREAMBLE}
+                def value = {expression};
+                return params.invert ? {RecipeSearch.SORT_INVERSION} : value;
+            """
+            digest = sha256(source.encode()).hexdigest()[:12]
+            scripts[sort] = (f"recipes-sort-{sort}-{digest}", source)
+        return scripts
+
+    @staticmethod
+    def sort_methods(match_count=1, exact=False, stored=False):
+        score_limit = pow(2, min(match_count, RecipeSearch.MAX_ENCODED_MATCHES))
+        params = {"score_limit": float(score_limit), "exact": exact, "invert": False}
+        methods = {}
+        for sort, (script_id, source) in RecipeSearch.sort_scripts().items():
+            script = {"id": script_id} if stored else {"source": source}
+            methods[sort] = {
+                "name": sort,
+                "script": {**script, "params": params},
+                "order": RecipeSearch.SORT_SCRIPTS[sort][1],
+            }
+        return methods
+
+    def register_sort_scripts(self):
+        try:
+            for script_id, source in self.sort_scripts().values():
+                try:
+                    self.es.get_script(id=script_id)
+                except NotFoundError:
+                    self.es.put_script(
+                        id=script_id,
+                        body={"script": {"lang": "painless", "source": source}},
+                    )
+        except Exception:
+            return False
+        return True
 
-    def _generate_sort_method(self, ingredients, sort):
+    def _generate_sort_method(self, sort, match_count, exact):
         # set the default sort method
         if not sort:
             sort = "relevance"
         # if no ingredients are specified, we may be able to short-cut sorting
-        include = [True for x in ingredients if x.positive]
-        if include == [] and sort != "duration":
-            return {"script": "doc.rating.value", "order": "desc"}
-        return self.sort_methods(match_count=len(include))[sort]
+        if not match_count and sort != "duration":
+            return {
+                "name": "rating",
+                "script": {"source": "doc.rating.value"},
+                "order": "desc",
+            }
+        return self.sort_methods(
+            match_count=match_count,
+            exact=exact,
+            stored=load_sort_scripts(),
+        )[sort]
 
     def _domain_facets(self):
         return {"domains": {"terms": {"field": "domain", "size": 100}}}
@@ -206,9 +417,13 @@ class RecipeSearch(QueryRepository):
         include_exact_clause = self._generate_include_exact_clause(ingredients)
         include_clause = self._generate_include_clause(ingredients)
         exclude_clause = self._generate_exclude_clause(ingredients)
-        sort_params = self._generate_sort_method(ingredients, sort)
 
         should = include_exact_clause if exact_match else include_clause
+        sort_params = self._generate_sort_method(
+            sort=sort,
+            match_count=len(should),
+            exact=exact_match,
+        )
         must_not = exclude_clause
         filter = [
             {"range": {"time": {"gte": 5}}},
@@ -221,52 +436,530 @@ class RecipeSearch(QueryRepository):
             min_include_match = len(should)
 
         return {
+            "bool": {
+                "should": should,
+                "must_not": must_not,
+                "filter": filter,
+                "minimum_should_match": min_include_match,
+            }
+        }, sort_params
+
+    def _render_ranking(self, query, sort_params, ranking, window):
+        script_query = {
             "function_score": {
                 "boost_mode": "replace",
+                "query": query,
+                "script_score": {"script": sort_params["script"]},
+            }
+        }
+
+        # Apply the sort script to every matching document; this is also
+        # required when there are no ingredient matches, because every
+        # first-pass score would be equal
+        if ranking == "script" or not query["bool"]["should"]:
+            return {
+                "query": script_query,
+                "sort": [{"_score": sort_params["order"]}],
+            }
+
+        # Rank documents by their constant-score ingredient matches, and then
+        # apply the sort script to the top-ranked window of documents only
+        if sort_params["order"] == "asc":
+            script = script_query["function_score"]["script_score"]["script"]
+            script["params"] = {**script["params"], "invert": True}
+        return {
+            "query": query,
+            "sort": [{"_score": "desc"}],
+            "rescore": {
+                "window_size": window,
                 "query": {
-                    "bool": {
-                        "should": should,
-                        "must_not": must_not,
-                        "filter": filter,
-                        "minimum_should_match": min_include_match,
-                    }
+                    "rescore_query": script_query,
+                    "query_weight": 0,
+                    "rescore_query_weight": 1,
+                    "score_mode": "total",
                 },
-                "script_score": {"script": {"source": sort_params["script"]}},
+            },
+        }
+
+    @staticmethod
+    def decode_match_counts(scores, exact=False):
+        encoded = np.asarray(scores).astype(np.int64)
+        found_count = np.bitwise_count(encoded).astype(np.int64)
+        exact_found_count = found_count if exact else np.zeros_like(found_count)
+        return found_count, exact_found_count
+
+    @staticmethod
+    def rerank(candidates, sort_params):
+        """
+        Order a collection of candidate hits, retrieved with their encoded
+        match scores and document values, using the same formulas as the
+        sort scripts; returns the positions of the hits in ranked order
+        """
+
+        def values(field):
+            return np.array(
+                [hit.get("fields", {}).get(field, [0])[0] for hit in candidates],
+                dtype=np.float64,
+            )
+
+        params = sort_params["script"]["params"]
+        scores = np.array([hit["_score"] for hit in candidates], dtype=np.float64)
+        product_count = values("product_count").astype(np.int64)
+        found_count, exact_found_count = RecipeSearch.decode_match_counts(
+            scores, params["exact"]
+        )
+        missing_count = product_count - found_count
+        exact_missing_count = product_count - exact_found_count
+
+        relevance_score = found_count * 2 + exact_found_count
+        normalized_score = scores / params["score_limit"]
+        missing_score = exact_missing_count * 2 - missing_count
+        # the sort scripts perform integer division here
+        missing_ratio = np.trunc(missing_count / product_count)
+
+        match sort_params["name"]:
+            case "relevance":
+                return np.argsort(-(relevance_score + normalized_score), kind="stable")
+            case "ingredients":
+                return np.argsort(missing_score + 1 - normalized_score, kind="stable")
+            case "duration":
+                return np.argsort(values("time") + missing_ratio, kind="stable")
+
+    def _rank_results(
+        self,
+        query,
+        sort_params,
+        ranking,
+        level,
+        aggregations,
+        post_filter,
+    ):
+        # Candidates for re-ranking are selected by their ingredient matches;
+        # without any, every matching document is ranked by the sort script
+        if ranking == "rerank" and not query["bool"]["should"]:
+            ranking = "script"
+
+        # Retrieve the ids of the top-ranked results, omitting their content
+        if ranking != "rerank":
+            ranked_query = self._render_ranking(
+                query=query,
+                sort_params=sort_params,
+                ranking=ranking,
+                window=app.config["RESCORE_WINDOW"],
+            )
+            results = yield {
+                **ranked_query,
+                "size": RANKED_RESULTS,
+                "_source": False,
+                "aggs": aggregations,
+                "post_filter": post_filter,
             }
-        }, [{"_score": sort_params["order"]}]
+            ids = [hit["_id"] for hit in results["hits"]["hits"]]
+
+        # Retrieve the top candidates by constant-score ingredient matches,
+        # including only the document values that are required for ranking
+        else:
+            results = yield {
+                "query": query,
+                "sort": [{"_score": "desc"}],
+                "size": max(app.config["RERANK_CANDIDATES"], RANKED_RESULTS),
+                "_source": False,
+                "docvalue_fields": ["product_count", "rating", "time"],
+                "aggs": aggregations,
+                "post_filter": post_filter,
+            }
+            candidates = results["hits"]["hits"]
+            ranking = self.rerank(candidates, sort_params) if candidates else []
+            ids = [candidates[idx]["_id"] for idx in ranking[:RANKED_RESULTS]]
+
+        return RankedResults(
+            ids=ids,
+            total=results["hits"]["total"]["value"],
+            # facets that were not requested are computed later, if required
+            aggregations=results.get("aggregations", {}) if aggregations else None,
+            level=level,
+        )
+
+    def _facet_results(self, query, aggregations, post_filter):
+        # Compute the facets for a query without retrieving any of its hits
+        results = yield {
+            "query": query,
+            "size": 0,
+            "aggs": aggregations,
+            "post_filter": post_filter,
+        }
+        return results
+
+    def _ranked_page(self, ranked, offset, limit, source):
+        # Retrieve the documents for the requested page of ranked results
+        page = ranked.ids[offset:][:limit]
+        documents = {}
+        if page:
+            results = yield {
+                "query": {"ids": {"values": page}},
+                "size": len(page),
+                "_source": source,
+            }
+            documents = {hit["_id"]: hit for hit in results["hits"]["hits"]}
+        return {
+            "hits": {
+                "hits": [documents[id] for id in page if id in documents],
+                "total": {"value": ranked.total},
+            },
+            "aggregations": ranked.aggregations or {},
+        }
+
+    def _cursor_search(
+        self,
+        query,
+        sort_params,
+        cursor,
+        level,
+        limit,
+        source,
+        aggregations,
+        post_filter,
+    ):
+        # Open a point-in-time snapshot for the first page of results, so that
+        # each later page continues from a consistent view of the index
+        pit_id = cursor.pit_id if cursor else None
+        if not pit_id:
+            pit = self.es.create_pit(index="recipes", keep_alive=CURSOR_KEEP_ALIVE)
+            pit_id = pit["pit_id"]
+
+        ranked_query = self._render_ranking(
+            query=query,
+            sort_params=sort_params,
+            ranking="script",
+            window=limit,
+        )
+        body = {
+            **ranked_query,
+            # a unique tiebreaker is required to resume between equal scores
+            "sort": ranked_query["sort"] + [{"id": "asc"}],
+            "size": limit,
+            "_source": source,
+            "pit": {"id": pit_id, "keep_alive": CURSOR_KEEP_ALIVE},
+            "post_filter": post_filter,
+        }
+        if cursor:
+            body["search_after"] = cursor.search_after
+        else:
+            body["aggs"] = aggregations
+        results = yield body
+
+        # Release the snapshot once the final page of results has been read
+        hits = results["hits"]["hits"]
+        pit_id = results.get("pit_id", pit_id)
+        if len(hits) < limit or not limit:
+            self.es.delete_pit(body={"pit_id": [pit_id]})
+            return results, None
+        return results, SearchCursor(pit_id, hits[-1]["sort"], level).encode()
 
     def _refined_queries(self, ingredients, dietary_properties, sort):
         # Provide an 'empty query' hint
         if not any([ingredients, sort]):
-            query, sort_method = self._render_query(
+            query, sort_params = self._render_query(
                 ingredients=ingredients,
                 dietary_properties=dietary_properties,
                 sort=sort,
             )
-            yield query, sort_method, "empty_query"
+            yield query, sort_params, "empty_query"
             return
 
         for exact_match in [False]:
-            query, sort_method = self._render_query(
+            query, sort_params = self._render_query(
                 ingredients=ingredients,
                 dietary_properties=dietary_properties,
                 exact_match=exact_match,
                 sort=sort,
             )
-            yield query, sort_method, None
+            yield query, sort_params, None
 
-        positive_ingredients = sum(x.positive for x in ingredients)
+        synonyms = load_ingredient_synonyms()
+        groups = EntityClause.term_groups(ingredients, lambda x: x.positive, synonyms)
+        positive_ingredients = len(groups)
         if positive_ingredients > 1:
             for min_include_match in range(positive_ingredients - 1, 0, -1):
                 for exact_match in [False]:
-                    query, sort_method = self._render_query(
+                    query, sort_params = self._render_query(
                         ingredients=ingredients,
                         dietary_properties=dietary_properties,
                         sort=sort,
                         exact_match=exact_match,
                         min_include_match=min_include_match,
                     )
-                    yield query, sort_method, "match_any"
+                    yield query, sort_params, "match_any"
+
+    def _plan_refinement(self, queries):
+        # A single candidate query requires no planning
+        if len(queries) == 1:
+            return 0
+
+        # Count the matches for every candidate query in a single request;
+        # each candidate matches a subset of the final, most-relaxed query
+        match_filters = {str(idx): query for idx, (query, _, _) in enumerate(queries)}
+        results = yield {
+            "query": queries[-1][0],
+            "size": 0,
+            "track_total_hits": False,
+            "aggs": {"refinements": {"filters": {"filters": match_filters}}},
+        }
+        buckets = results["aggregations"]["refinements"]["buckets"]
+
+        # Select the first candidate query that finds sufficient results
+        for idx in range(len(queries)):
+            if buckets[str(idx)]["doc_count"] >= 5:
+                return idx
+        return len(queries) - 1
+
+    def _execute(self, plans):
+        """
+        Run a collection of search plans to completion, sending each round of
+        their requests to the search engine together in a single round trip
+        """
+        results = [None] * len(plans)
+        responses = dict.fromkeys(range(len(plans)))
+        while responses:
+            requests = {}
+            for idx, response in responses.items():
+                # A failed request is raised within the plan that sent it, and
+                # the failure of a plan becomes its result
+                try:
+                    if isinstance(response, TransportError):
+                        requests[idx] = plans[idx].throw(response)
+                    else:
+                        requests[idx] = plans[idx].send(response)
+                except StopIteration as e:
+                    results[idx] = e.value
+                except (TransportError, ValueError) as e:
+                    results[idx] = e
+            responses = self._search_all(requests)
+        return results
+
+    def _search_all(self, requests):
+        # Point-in-time searches must not specify an index, and requests that
+        # retrieve no hits can be served from the shard request cache
+        def params(body):
+            params = {"index": None if "pit" in body else "recipes"}
+            if body.get("size") == 0:
+                params["request_cache"] = True
+            return params
+
+        if len(requests) <= 1:
+            responses = {}
+            for idx, body in requests.items():
+                try:
+                    responses[idx] = self.es.search(body=body, **params(body))
+                except TransportError as e:
+                    responses[idx] = e
+            return responses
+
+        # Each failed search is reported with the error type for its status
+        searches = []
+        for body in requests.values():
+            header = {k: v for k, v in params(body).items() if v is not None}
+            searches += [header, body]
+        responses = self.es.msearch(body=searches)["responses"]
+        for idx, response in enumerate(responses):
+            if "error" in response:
+                error = HTTP_EXCEPTIONS.get(response["status"], TransportError)
+                responses[idx] = error(response["status"], response["error"])
+        return dict(zip(requests, responses))
+
+    def _search_plan(
+        self,
+        ingredients,
+        equipment,
+        offset,
+        limit,
+        sort,
+        domains,
+        dietary_properties,
+        allow_refinement=True,
+        suggest_products=False,
+        ranking="script",
+        cursor=None,
+        facets=True,
+        fields=None,
+    ):
+        # Search plans are generators that yield each of the request bodies
+        # that they require, and then receive the corresponding responses
+        offset = max(0, offset)
+        limit = max(0, limit)
+        limit = min(25, limit)
+
+        # Product suggestions are the content of an explore response
+        facets = facets or suggest_products
+        post_filter = self._generate_post_filter(domains=domains)
+
+        # Retrieve only the document fields that the response requires
+        source = Recipe.source_fields(fields)
+
+        queries = list(
+            self._refined_queries(
+                ingredients=ingredients,
+                dietary_properties=dietary_properties,
+                sort=sort,
+            )
+        )
+        if not allow_refinement:
+            queries = queries[:1]
+
+        # Continue from the refinement level of the first page of results
+        resume = SearchCursor.decode(cursor) if cursor else None
+        if resume and not 0 <= resume.level < len(queries):
+            raise ValueError("Invalid search cursor")
+
+        # Every page of a search is served from the same ranked result ids
+        ranking_key = None
+        if cursor is None and not suggest_products:
+            ranking_key = SearchKey.from_params(
+                ingredients=ingredients,
+                equipment=equipment,
+                offset=0,
+                limit=0,
+                sort=sort,
+                domains=domains,
+                dietary_properties=dietary_properties,
+                allow_refinement=allow_refinement,
+                ranking=ranking,
+            )
+        ranked = ranking_cache.get(ranking_key) if ranking_key else None
+
+        if resume:
+            level = resume.level
+        elif ranked:
+            level = ranked.level
+        else:
+            level = yield from self._plan_refinement(queries)
+        query, sort_params, refinement = queries[level]
+
+        aggregations = (
+            self._generate_aggregations(
+                suggest_products=suggest_products,
+                ingredients=ingredients,
+                dietary_properties=dietary_properties,
+            )
+            if facets
+            else {}
+        )
+
+        next_cursor = None
+        if cursor is not None:
+            results, next_cursor = yield from self._cursor_search(
+                query=query,
+                sort_params=sort_params,
+                cursor=resume,
+                level=level,
+                limit=limit,
+                source=source,
+                aggregations=aggregations,
+                post_filter=post_filter,
+            )
+        elif not limit:
+            # A search for facets alone does not require any ranking
+            results = yield from self._facet_results(
+                query=query,
+                aggregations=aggregations,
+                post_filter=post_filter,
+            )
+        elif ranking_key:
+            if not ranked:
+                ranked = yield from self._rank_results(
+                    query=query,
+                    sort_params=sort_params,
+                    ranking=ranking,
+                    level=level,
+                    aggregations=aggregations,
+                    post_filter=post_filter,
+                )
+                ranking_cache.set(ranking_key, ranked)
+            elif aggregations and ranked.aggregations is None:
+                results = yield from self._facet_results(
+                    query=query,
+                    aggregations=aggregations,
+                    post_filter=post_filter,
+                )
+                ranked = ranked._replace(aggregations=results.get("aggregations", {}))
+                ranking_cache.set(ranking_key, ranked)
+            results = yield from self._ranked_page(ranked, offset, limit, source)
+        else:
+            ranked_query = self._render_ranking(
+                query=query,
+                sort_params=sort_params,
+                ranking="rescore" if ranking == "rescore" else "script",
+                window=app.config["RESCORE_WINDOW"],
+            )
+            results = yield {
+                **ranked_query,
+                "from": offset,
+                "size": limit,
+                "_source": source,
+                "aggs": aggregations,
+                "post_filter": post_filter,
+            }
+
+        match = MatchContext.of(ingredients)
+        recipes = [
+            render_recipe(
+                recipe_id=result["_source"]["id"],
+                indexed_at=result["_source"].get("indexed_at"),
+                load=lambda doc=result["_source"]: RecipeView.from_doc(doc),
+                ingredients=match,
+                fields=fields,
+            )
+            for result in results["hits"]["hits"]
+        ]
+
+        # Later pages of cursor-paged results do not repeat the aggregations
+        prefilter = results.get("aggregations", {}).get("prefilter", {})
+        if not facets:
+            prefilter = {}
+
+        # TODO: Can this bucket sorting be moved into the aggregation pipeline?
+        if suggest_products:
+            total = prefilter["doc_count"]
+
+            products = prefilter["products"]["choices"]["singular"]["buckets"]
+            products = [x for x in products if x["doc_count"] != total]
+            products.sort(key=lambda x: abs(x["doc_count"] - (total / 2)))
+            prefilter = {**prefilter, "products": {"buckets": products[:10]}}
+
+        facets = {}
+        for field, content in prefilter.items():
+            if not isinstance(content, dict) or "buckets" not in content:
+                continue
+            facets[field] = [
+                {
+                    "key": bucket["key"],
+                    "count": min(bucket["doc_count"], 100),
+                }
+                for bucket in content["buckets"]
+            ]
+
+        refinements = [refinement] if recipes and refinement else []
+        if equipment:
+            refinements += ["equipment_search_unavailable"]
+
+        total = results["hits"]["total"]["value"]
+        if cursor is not None:
+            return {
+                "authority": "api",
+                "total": total,
+                "results": recipes,
+                "facets": facets,
+                "refinements": refinements,
+                "cursor": next_cursor,
+            }
+
+        return {
+            "authority": "api",
+            "total": min(total, 25 * limit),
+            "results": recipes,
+            "facets": facets,
+            "refinements": refinements,
+        }
 
     def query(
         self,
@@ -279,6 +972,10 @@ class RecipeSearch(QueryRepository):
         dietary_properties,
         allow_refinement=True,
         suggest_products=False,
+        ranking="script",
+        cursor=None,
+        facets=True,
+        fields=None,
     ):
         """
         Searching for recipes is currently supported in three different modes:
@@ -363,122 +1060,134 @@ class RecipeSearch(QueryRepository):
         To achieve this, we use OpenSearch's query syntax to encode information
         about the quality of each match during search execution.
 
-        We use `constant_score` queries to store a power-of-ten score for each
-        query ingredient, with the value doubled for exact matches.
+        We use `constant_score` queries to store a power-of-two score for each
+        query ingredient, so that each match sets a distinct bit of the score.
+        An ingredient that has synonyms is matched by a single clause, which
+        matches any of the synonyms and scores as one match.
 
         For example, in a query for `onion`, `tomato`, `tofu`:
 
                                 onion   tomato  tofu        score
-        recipe 1                exact   exact   partial     300 + 30 + 1 = 331
-        recipe 2                partial no      exact       100 +  0 + 3 = 103
-        recipe 3                exact   no      exact       300 +  0 + 3 = 303
+        recipe 1                yes     yes     yes         4 + 2 + 1 = 7
+        recipe 2                yes     no      yes         4 + 0 + 1 = 5
+        recipe 3                no      yes     no          0 + 2 + 0 = 2
 
-        This allows the final sorting stage to determine - with some small
-        possibility of error* - how many exact and inexact matches were
-        discovered for each recipe.
+        This allows the final sorting stage to determine how many matches were
+        discovered for each recipe by counting the bits that are set in the
+        score; in exact-match mode, the clauses only match recipes containing
+        the exact product, and every match is counted as exact.
 
-                                score   exact_matches       all_matches
-        recipe 1                331     1 + 1 + 0 = 2       1 + 1 + 1 = 3
-        recipe 2                103     0 + 0 + 1 = 1       1 + 0 + 1 = 2
-        recipe 3                303     1 + 0 + 1 = 2       1 + 0 + 1 = 2
+                                score   bits    matches
+        recipe 1                7       111     3
+        recipe 2                5       101     2
+        recipe 3                2       010     1
 
-        At this stage we have enough information to sort the result set based
-        on the number of overall matches and to use the number of exact matches
-        as a tiebreaker within each group.
+        Each clause contributes its score at most once per recipe, even when
+        an ingredient appears multiple times in a recipe.
+
+        The score itself is used as a tiebreaker between recipes with an equal
+        number of matches, preferring matches on earlier query ingredients.
 
         Result ranking:
 
-        - (3 matches, 2 exact) recipe 1
-        - (2 matches, 2 exact) recipe 3
-        - (2 matches, 1 exact) recipe 2
+        - (3 matches) recipe 1
+        - (2 matches) recipe 2
+        - (1 match) recipe 3
 
+        Scores are single-precision floating point values, which represent
+        integers exactly up to 2^24; query terms beyond the first 24 do not
+        contribute to the score.
 
-        * Inconsistent results and ranking errors can occur if an ingredient
-          appears multiple times in a recipe, resulting in duplicate counts
-        """
-        offset = max(0, offset)
-        limit = max(0, limit)
-        limit = min(25, limit)
+        When a `cursor` is provided - an empty string for the first page - the
+        results are paged using a point-in-time snapshot of the index, and
+        each response includes the cursor for the following page, or `None`
+        when no further results are available.  Cursor-paged searches use the
+        'script' ranking mode and ignore the `offset` parameter.
 
-        aggregations = self._generate_aggregations(
-            suggest_products=suggest_products,
-            ingredients=ingredients,
-            dietary_properties=dietary_properties,
-        )
-        post_filter = self._generate_post_filter(domains=domains)
+        When `fields` are provided, each result contains only those fields of
+        the recipe response representation - along with its `id` - and only
+        the corresponding document fields are retrieved from the index.
 
-        queries = self._refined_queries(
-            ingredients=ingredients,
-            dietary_properties=dietary_properties,
-            sort=sort,
-        )
-        for query, sort_method, refinement in queries:
-            results = self.es.search(
-                index="recipes",
-                body={
-                    "query": query,
-                    "from": offset,
-                    "size": limit,
-                    "sort": sort_method,
-                    "aggs": aggregations,
-                    "post_filter": post_filter,
-                },
-            )
-            if not allow_refinement:
-                break
-            if results["aggregations"]["prefilter"]["doc_count"] >= 5:
-                break
-
-        recipes = []
-        for result in results["hits"]["hits"]:
-            recipe = Recipe.from_doc(result["_source"])
-            recipes.append(recipe.to_dict(ingredients))
-
-        # TODO: Can this bucket sorting be moved into the aggregation pipeline?
-        if suggest_products:
-            prefilter = results["aggregations"]["prefilter"]
-            total = prefilter["doc_count"]
-
-            products = prefilter["products"]["choices"]["singular"]["buckets"]
-            products = [x for x in products if x["doc_count"] != total]
-            products.sort(key=lambda x: abs(x["doc_count"] - (total / 2)))
-            prefilter["products"] = {"buckets": products[:10]}
-
-        facets = {}
-        for field, content in results["aggregations"]["prefilter"].items():
-            if not isinstance(content, dict) or "buckets" not in content:
-                continue
-            facets[field] = [
-                {
-                    "key": bucket["key"],
-                    "count": min(bucket["doc_count"], 100),
-                }
-                for bucket in content["buckets"]
-            ]
-
-        refinements = [refinement] if recipes and refinement else []
-        if equipment:
-            refinements += ["equipment_search_unavailable"]
-
-        return {
-            "authority": "api",
-            "total": min(results["hits"]["total"]["value"], 25 * limit),
-            "results": recipes,
+        Facets are computed unless `facets` is disabled, which is useful for
+        clients that retain the facets from the first page of their results;
+        a search with a `limit` of zero computes its facets alone.
+        """
+        params = {
+            "ingredients": ingredients,
+            "equipment": equipment,
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "domains": domains,
+            "dietary_properties": dietary_properties,
+            "allow_refinement": allow_refinement,
+            "suggest_products": suggest_products,
+            "ranking": ranking,
             "facets": facets,
-            "refinements": refinements,
+            "fields": fields,
         }
+        if cursor is not None:
+            return self._single_query({**params, "cursor": cursor})
+        key = SearchKey.from_params(**params)
+        return search_flights.do(key, lambda: self._single_query(params))
+
+    def _single_query(self, params):
+        (results,) = self.multi_query([params])
+        if isinstance(results, Exception):
+            raise results
+        return results
+
+    def multi_query(self, searches):
+        """
+        Run a collection of searches together; the result of any search that
+        fails is the exception that it raised, so that the other searches in
+        the collection are unaffected
+        """
+        # Cursor-paged searches read from a snapshot, and are never cached
+        keys = [
+            None if "cursor" in search else SearchKey.from_params(**search)
+            for search in searches
+        ]
+        results = [search_cache.get(key) if key else None for key in keys]
+
+        misses = [idx for idx, result in enumerate(results) if result is None]
+        plans = [self._search_plan(**searches[idx]) for idx in misses]
+        for idx, result in zip(misses, self._execute(plans)):
+            if keys[idx] and not isinstance(result, Exception):
+                search_cache.set(keys[idx], result)
+            results[idx] = result
+        return results
 
-    def explore(self, ingredients, dietary_properties):
+    @staticmethod
+    def explore_params(ingredients, dietary_properties, fields=None):
         depth = len(ingredients)
         limit = 10 if depth >= 3 else 0
-        return self.query(
+        return {
+            "ingredients": ingredients,
+            "equipment": [],
+            "offset": 0,
+            "limit": limit,
+            "sort": None,
+            "domains": [],
+            "dietary_properties": dietary_properties,
+            "allow_refinement": False,
+            "suggest_products": True,
+            "fields": fields,
+        }
+
+    def facets(self, ingredients, equipment, sort, domains, dietary_properties):
+        results = self.query(
             ingredients=ingredients,
-            equipment=[],
+            equipment=equipment,
             offset=0,
-            limit=limit,
-            sort=None,
-            domains=[],
+            limit=0,
+            sort=sort,
+            domains=domains,
             dietary_properties=dietary_properties,
-            allow_refinement=False,
-            suggest_products=True,
+        )
+        return {"authority": results["authority"], "facets": results["facets"]}
+
+    def explore(self, ingredients, dietary_properties, fields=None):
+        return self.query(
+            **self.explore_params(ingredients, dietary_properties, fields)
         )
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from reciperadar.utils.metrics import metrics
+
+
+class ResultCache:
+    """
+    A bounded least-recently-used cache with per-entry expiry.
+
+    When a `generation` function is provided, it is called at most once every
+    `generation_interval` seconds; if the value it returns has changed since
+    the previous check, all cached entries are discarded.
+
+    When a `sizeof` function is provided, `maxsize` limits the total size of
+    the cached values as measured by that function, instead of their number.
+    """
+
+    def __init__(
+        self, maxsize, ttl, generation=None, generation_interval=60, sizeof=None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = generation
+        self.generation_interval = generation_interval
+        self.sizeof = sizeof or (lambda value: 1)
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._generation = None
+        self._generation_checked_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_generation(self):
+        now = monotonic()
+        checked_at = self._generation_checked_at
+        if checked_at is not None and now < checked_at + self.generation_interval:
+            return
+        self._generation_checked_at = now
+
+        try:
+            generation = self.generation()
+        except Exception:
+            return
+        if generation is None or generation == self._generation:
+            return
+
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self._generation = generation
+
+    def get(self, key):
+        if self.generation:
+            self._check_generation()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if monotonic() >= expires_at:
+                del self._entries[key]
+                self.size -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.maxsize:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self.size -= previous[2]
+            self._entries[key] = (value, monotonic() + self.ttl, size)
+            self.size += size
+            while self.size > self.maxsize:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class PrefixCache(ResultCache):
+    """
+    A cache of autosuggest candidate lists, keyed by the prefix that found
+    them.
+
+    When the candidates for a prefix are always a subset of the candidates
+    for any shorter prefix, `narrow` is provided to filter a candidate list
+    to a longer prefix, preserving its order.  A longer prefix is then
+    answered from the cached list of a shorter prefix, if that list is
+    complete - containing fewer candidates than the `limit` requested.
+    """
+
+    def __init__(self, name, maxsize, ttl, limit, narrow=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.name = name
+        self.limit = limit
+        self.narrow = narrow
+
+    def lookup(self, prefix):
+        candidates = self.get(prefix)
+        if candidates is not None:
+            self._record("hit")
+            return candidates
+        candidates = self._narrowed(prefix) if self.narrow else None
+        self._record("miss" if candidates is None else "narrowed")
+        return candidates
+
+    def _narrowed(self, prefix):
+        # The longest cached prefix has the fewest candidates; if its list is
+        # incomplete, then so are the lists of any shorter prefixes
+        for length in range(len(prefix) - 1, 0, -1):
+            candidates = self.get(prefix[:length])
+            if candidates is None:
+                continue
+            if len(candidates) >= self.limit:
+                return None
+            candidates = self.narrow(candidates, prefix)
+            self.set(prefix, candidates)
+            return candidates
+        return None
+
+    def _record(self, result):
+        labels = {"cache": self.name, "result": result}
+        metrics.increment("prefix_cache_requests_total", labels)
@@ -0,0 +1,45 @@
+from uuid import uuid4
+
+from flask.json.provider import DefaultJSONProvider
+
+
+class JSONFragment:
+    """
+    A value that has already been encoded as JSON, and that is included as-is
+    when a response containing it is serialized.
+    """
+
+    __slots__ = ()
+
+    @property
+    def text(self):
+        raise NotImplementedError
+
+
+class FragmentJSONProvider(DefaultJSONProvider):
+    """
+    A JSON provider that splices pre-encoded fragments into its output, in
+    place of placeholder strings that are emitted while serializing.
+    """
+
+    def dumps(self, obj, **kwargs):
+        token = f"\x00{uuid4().hex}:"
+        fragments = []
+
+        def default(o):
+            if isinstance(o, JSONFragment):
+                fragments.append(o)
+                return f"{token}{len(fragments) - 1}"
+            return DefaultJSONProvider.default(o)
+
+        text = super().dumps(obj, default=default, **kwargs)
+        if not fragments:
+            return text
+
+        placeholder = super().dumps(token)[:-1]
+        parts = text.split(placeholder)
+        output = [parts[0]]
+        for part in parts[1:]:
+            idx, _, remainder = part.partition('"')
+            output += [fragments[int(idx)].text, remainder]
+        return "".join(output)
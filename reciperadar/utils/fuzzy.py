@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+
+def auto_fuzziness(term):
+    # Equivalent to the 'AUTO' fuzziness of the search engine
+    if len(term) < 3:
+        return 0
+    if len(term) < 6:
+        return 1
+    return 2
+
+
+def prefix_distance(term, word, limit):
+    """
+    The fewest edits - insertions, deletions, substitutions, and swaps of
+    adjacent characters - that transform `term` into any prefix of `word`;
+    any distance greater than `limit` is reported as `limit + 1`
+    """
+    before, previous, current = None, None, list(range(len(word) + 1))
+    for i in range(1, len(term) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(word)
+        for j in range(1, len(word) + 1):
+            cost = term[i - 1] != word[j - 1]
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if i > 1 and j > 1 and term[i - 2] == word[j - 1]:
+                if term[i - 1] == word[j - 2]:
+                    current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return min(min(current), limit + 1)
+
+
+class FuzzyPrefixIndex:
+    """
+    An index of words that finds the words beginning with a term, allowing
+    for typing errors in the term.
+
+    The words are stored in a trie, which is walked while computing the edit
+    distance from the term to each prefix, one row at a time.  A branch is
+    abandoned once no longer prefix within it can be close enough to the
+    term, and every word within a branch is found once its prefix is.
+    """
+
+    __slots__ = ("prefixes", "trie")
+
+    def __init__(self, words):
+        self.prefixes = defaultdict(set)
+        self.trie = {}
+        for word in words:
+            node = self.trie
+            for length in range(1, len(word) + 1):
+                self.prefixes[word[:length]].add(word)
+                node = node.setdefault(word[length - 1], {})
+
+    def search(self, term, max_edits=0):
+        if not max_edits:
+            return set(self.prefixes.get(term, set()))
+
+        results = set()
+        branches = [("", self.trie, None, list(range(len(term) + 1)))]
+        while branches:
+            prefix, node, before, previous = branches.pop()
+            for char, child in node.items():
+                current = [previous[0] + 1]
+                for i in range(1, len(term) + 1):
+                    cost = term[i - 1] != char
+                    distance = min(
+                        previous[i] + 1,
+                        current[i - 1] + 1,
+                        previous[i - 1] + cost,
+                    )
+                    if before and i > 1 and term[i - 2] == char:
+                        if term[i - 1] == prefix[-1]:
+                            distance = min(distance, before[i - 2] + 1)
+                    current.append(distance)
+                if current[-1] <= max_edits:
+                    results |= self.prefixes[prefix + char]
+                elif min(current) <= max_edits:
+                    branches.append((prefix + char, child, previous, current))
+        return results
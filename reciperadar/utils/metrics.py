@@ -0,0 +1,54 @@
+from collections import defaultdict
+from threading import Lock
+
+
+class Metrics:
+    """
+    A minimal in-process metrics registry, rendered in the Prometheus text
+    exposition format.  Each worker process maintains its own values.
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def increment(self, name, labels=None, value=1):
+        with self._lock:
+            self._counters[name, self._labels(labels)] += value
+
+    def gauge(self, name, callback, labels=None):
+        with self._lock:
+            self._gauges[name, self._labels(labels)] = callback
+
+    def value(self, name, labels=None):
+        key = name, self._labels(labels)
+        if key in self._gauges:
+            return self._gauges[key]()
+        return self._counters.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+        samples = [
+            ("counter", name, labels, value) for (name, labels), value in counters
+        ] + [("gauge", name, labels, callback()) for (name, labels), callback in gauges]
+
+        lines, described = [], set()
+        for kind, name, labels, value in sorted(samples, key=lambda x: x[1:3]):
+            if name not in described:
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+            if labels:
+                pairs = ",".join(f'{label}="{value}"' for label, value in labels)
+                name = f"{name}{{{pairs}}}"
+            lines.append(f"{name} {float(value or 0)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,57 @@
+import os
+import random
+from threading import Event, Lock, Thread
+
+
+class Refresher:
+    """
+    Calls `refresh` from a background thread every `interval` seconds, with
+    each interval randomly varied by up to `jitter` (a fraction of the
+    interval) so that worker processes do not refresh in lock-step.
+
+    The thread is started by the first call to `start` in each process, so
+    that worker processes forked after import each run their own refresher;
+    when `immediate` is set, the thread refreshes once as soon as it starts.
+    """
+
+    def __init__(self, name, refresh, interval, jitter=0.1, immediate=False):
+        self.name = name
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self.immediate = immediate
+        self._pid = None
+        self._stopped = Event()
+        self._lock = Lock()
+
+    def delay(self):
+        variation = random.uniform(-self.jitter, self.jitter)
+        return self.interval * (1 + variation)
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopped = Event()
+            thread = Thread(target=self._run, name=self.name, daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._pid = None
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            pass
+
+    def _run(self):
+        stopped = self._stopped
+        if self.immediate:
+            self._refresh()
+        while not stopped.wait(self.delay()):
+            self._refresh()
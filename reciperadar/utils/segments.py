@@ -0,0 +1,172 @@
+import fcntl
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from tempfile import NamedTemporaryFile
+
+
+class SharedSegment(Mapping):
+    """
+    A read-only mapping of strings to lists of strings, stored in a file that
+    is memory-mapped by every worker process that reads it.
+
+    The file contains a header, a fixed-width index of entries sorted by key,
+    and a data section containing UTF-8 encoded keys and values.  Lookups use
+    a binary search over the index and decode only the requested entry.
+
+    Segments are rebuilt by writing a complete replacement file and renaming
+    it into place, so readers never observe a partially-written segment.
+    """
+
+    MAGIC = b"RRSEG001"
+    HEADER = struct.Struct("<8sI")
+    ENTRY = struct.Struct("<IIII")
+    SEPARATOR = "\x1f"
+
+    def __init__(self, path):
+        self.path = path
+        self._view = None
+        self._inode = None
+
+    @staticmethod
+    def encode(mapping):
+        keys = sorted((key.encode(), key) for key in mapping)
+        index, data = [], bytearray()
+        offset = SharedSegment.HEADER.size + SharedSegment.ENTRY.size * len(keys)
+        for encoded_key, key in keys:
+            encoded_value = SharedSegment.SEPARATOR.join(mapping[key]).encode()
+            key_offset = offset + len(data)
+            data += encoded_key
+            value_offset = offset + len(data)
+            data += encoded_value
+            value_end = offset + len(data)
+            index.append(
+                SharedSegment.ENTRY.pack(
+                    key_offset, value_offset, value_offset, value_end
+                )
+            )
+        header = SharedSegment.HEADER.pack(SharedSegment.MAGIC, len(keys))
+        return header + b"".join(index) + data
+
+    def write(self, mapping):
+        directory = os.path.dirname(self.path)
+        with NamedTemporaryFile(dir=directory, delete=False) as f:
+            f.write(self.encode(mapping))
+        os.replace(f.name, self.path)
+
+    def reload(self):
+        # Map the latest segment file, if it has been replaced since last load
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        with open(self.path, "rb") as f:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = self.HEADER.unpack_from(view)
+        if magic != self.MAGIC:
+            return False
+        self._view, self._inode = (view, count), stat.st_ino
+        return True
+
+    @property
+    def loaded_at(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+        return datetime.fromtimestamp(mtime, tz=UTC)
+
+    def rebuild(self, load, expiry):
+        """
+        Replace the segment with the mapping returned by `load`, unless the
+        segment was written after `expiry`; this is performed by at most one
+        process at a time, and other callers return immediately
+        """
+        lock_path = f"{self.path}.lock"
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                loaded_at = self.loaded_at
+                if loaded_at and loaded_at > expiry:
+                    return False
+                mapping = load()
+                if not mapping:
+                    return False
+                self.write(mapping)
+                return True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _entry(self, view, idx):
+        # Each entry holds the start and end offsets of its key and value
+        offset = self.HEADER.size + self.ENTRY.size * idx
+        return self.ENTRY.unpack_from(view, offset)
+
+    def _bisect(self, view, count, encoded_key):
+        # Find the position of the first key that is not less than the key
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_end, _, _ = self._entry(view, mid)
+            if view[key_offset:key_end] < encoded_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, key):
+        if self._view is None:
+            return None
+        view, count = self._view
+        encoded_key = key.encode()
+        idx = self._bisect(view, count, encoded_key)
+        if idx < count:
+            key_offset, key_end, value_offset, value_end = self._entry(view, idx)
+            if view[key_offset:key_end] == encoded_key:
+                return view[value_offset:value_end]
+        return None
+
+    def _decode(self, value):
+        return value.decode().split(self.SEPARATOR) if value else []
+
+    def prefixed(self, prefix):
+        """
+        Iterate over the entries whose keys begin with `prefix`, in key order
+        """
+        if self._view is None:
+            return
+        view, count = self._view
+        encoded_prefix = prefix.encode()
+        for idx in range(self._bisect(view, count, encoded_prefix), count):
+            key_offset, key_end, value_offset, value_end = self._entry(view, idx)
+            key = view[key_offset:key_end]
+            if not key.startswith(encoded_prefix):
+                return
+            yield key.decode(), self._decode(view[value_offset:value_end])
+
+    def __getitem__(self, key):
+        value = self._find(key)
+        if value is None:
+            raise KeyError(key)
+        return self._decode(value)
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __iter__(self):
+        if self._view is None:
+            return
+        view, count = self._view
+        for idx in range(count):
+            key_offset, key_end, _, _ = self._entry(view, idx)
+            yield view[key_offset:key_end].decode()
+
+    def __len__(self):
+        return self._view[1] if self._view else 0
@@ -0,0 +1,65 @@
+from threading import Event, Lock
+
+from reciperadar.utils.metrics import metrics
+
+
+class Flight:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class FlightGroup:
+    """
+    Coalesces concurrent calls that share the same key, so that only one of
+    them runs; the other callers wait for it and receive the same result, or
+    the same exception.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = Lock()
+
+        labels = {"group": name}
+        metrics.gauge(
+            "singleflight_coalescing_ratio",
+            lambda: self.coalesced / self.calls if self.calls else 0,
+            labels,
+        )
+
+    @property
+    def calls(self):
+        return metrics.value("singleflight_calls_total", {"group": self.name})
+
+    @property
+    def coalesced(self):
+        return metrics.value("singleflight_coalesced_total", {"group": self.name})
+
+    def do(self, key, fn):
+        labels = {"group": self.name}
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+        metrics.increment("singleflight_calls_total", labels)
+
+        if not leader:
+            metrics.increment("singleflight_coalesced_total", labels)
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
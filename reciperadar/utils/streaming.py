@@ -0,0 +1,40 @@
+from flask import jsonify, stream_with_context
+
+from reciperadar import app
+
+
+def iter_json(obj, stream="results"):
+    """
+    Encode a response object in pieces, encoding each item of the `stream`
+    list separately; the output is identical to a compact JSON response, so
+    the fields that sort before and after the list frame it as a header and
+    a trailer.
+    """
+
+    def dumps(value):
+        return app.json.dumps(value, separators=(",", ":"))
+
+    yield "{"
+    for idx, key in enumerate(sorted(obj)):
+        yield f'{"," if idx else ""}{dumps(key)}:'
+        if key != stream:
+            yield dumps(obj[key])
+            continue
+        yield "["
+        for item_idx, item in enumerate(obj[key]):
+            yield f'{"," if item_idx else ""}{dumps(item)}'
+        yield "]"
+    yield "}\n"
+
+
+def json_response(obj):
+    # Indented responses are produced in debug mode, and are not streamed
+    provider = app.json
+    indented = (provider.compact is None and app.debug) or provider.compact is False
+    if not app.config["STREAMING_RESPONSES"] or indented:
+        return jsonify(obj)
+
+    return app.response_class(
+        stream_with_context(iter_json(obj)),
+        mimetype=provider.mimetype,
+    )
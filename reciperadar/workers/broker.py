@@ -1,3 +1,14 @@
+from datetime import timedelta
+
 from celery import Celery
 
 celery = Celery("reciperadar", broker="pyamqp://guest@rabbitmq")
+
+# Rebuild the product autosuggest index as the recipe corpus changes
+celery.conf.beat_schedule = {
+    "index-product-autosuggest": {
+        "task": "reciperadar.workers.recipes.index_product_autosuggest",
+        "schedule": timedelta(hours=1).total_seconds(),
+        "options": {"queue": "index_product_autosuggest"},
+    },
+}
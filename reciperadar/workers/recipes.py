@@ -1,3 +1,6 @@
+from celery.signals import worker_ready
+
+from reciperadar.search.ingredients import IngredientSearch
 from reciperadar.workers.broker import celery
 
 
@@ -6,6 +9,17 @@ def index_recipe(recipe_id):
     pass
 
 
+@celery.task(queue="index_product_autosuggest")
+def index_product_autosuggest():
+    IngredientSearch().build_autosuggest_index()
+
+
+@worker_ready.connect
+def build_product_autosuggest(**kwargs):
+    # Build an index when a worker starts, rather than after a full interval
+    index_product_autosuggest.delay()
+
+
 @celery.task(queue="crawl_recipe")
 def crawl_recipe(url):
     pass
@@ -0,0 +1,13 @@
+from reciperadar.utils.metrics import metrics
+
+
+def test_metrics_export(client):
+    metrics.increment("test_requests_total", {"endpoint": "search"})
+    metrics.gauge("test_ratio", lambda: 0.5)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "# TYPE test_requests_total counter" in response.text
+    assert 'test_requests_total{endpoint="search"} 1.0' in response.text
+    assert "test_ratio 0.5" in response.text
@@ -1,24 +1,62 @@
+from copy import deepcopy
 from unittest.mock import patch
 
 import pytest
+from opensearchpy.exceptions import ConnectionError, NotFoundError, TransportError
 
+from reciperadar import app
 from reciperadar.api.recipes import Feedback
 from reciperadar.models.recipes import Recipe
-from reciperadar.search.recipes import RecipeSearch
+from reciperadar.search.recipes import (
+    RecipeSearch,
+    SearchCursor,
+    ranking_cache,
+    search_cache,
+)
 from reciperadar.search.base import EntityClause
+from reciperadar.utils.streaming import iter_json
 
 
 @patch.object(RecipeSearch, "query")
-def test_search_invalid_sort(query, client):
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        {"sort": "invalid"},
+        {"ranking": "invalid"},
+        {"cursor": "invalid"},
+        {"fields": "title,invalid"},
+        {"facets": "invalid"},
+    ],
+)
+def test_search_invalid_sort(query, client, query_string):
     response = client.get(
         path="/recipes/search",
-        query_string={"sort": "invalid"},
+        query_string=query_string,
     )
 
     assert response.status_code == 400
     assert not query.called
 
 
+@patch("reciperadar.api.recipes.recrawl_search.delay")
+@patch("reciperadar.api.recipes.store_event")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+@patch("reciperadar.search.base.QueryRepository.es.create_pit")
+def test_search_cursor_expired(create_pit, search, synonyms, store, recrawl, client):
+    cursor = SearchCursor("expired-pit", [3.0, "abc"], 0).encode()
+    search.side_effect = NotFoundError(404, "search_phase_execution_exception")
+    synonyms.return_value = {}
+
+    response = client.get(
+        path="/recipes/search",
+        query_string={"ingredients[]": "tomato", "cursor": cursor},
+    )
+
+    assert response.status_code == 410
+    assert not create_pit.called
+
+
 @patch("reciperadar.api.recipes.recrawl_search.delay")
 @patch("reciperadar.api.recipes.store_event")
 @patch("reciperadar.search.recipes.load_ingredient_synonyms")
@@ -72,6 +110,39 @@ def test_search_simple_query(query, synonyms, store, recrawl, client, raw_recipe
     assert query.call_args[1]["ingredients"] == expected_clauses
 
 
+@patch("reciperadar.api.recipes.recrawl_search.delay")
+@patch("reciperadar.api.recipes.store_event")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_search_streaming(search, synonyms, store, recrawl, client, raw_recipe_hit):
+    search.return_value = {
+        "hits": {"hits": [raw_recipe_hit], "total": {"value": 1}},
+        "aggregations": {
+            "prefilter": {
+                "doc_count": 1,
+                "domains": {"buckets": [{"key": "example.test", "doc_count": 1}]},
+            }
+        },
+    }
+    synonyms.return_value = {}
+    query_string = {"ingredients[]": ["one"], "sort": "duration"}
+
+    responses = []
+    with patch("reciperadar.utils.streaming.iter_json", wraps=iter_json) as writer:
+        for streaming in [False, True]:
+            app.config["STREAMING_RESPONSES"] = streaming
+            try:
+                response = client.get("/recipes/search", query_string=query_string)
+                responses.append(response)
+            finally:
+                app.config["STREAMING_RESPONSES"] = False
+
+    buffered, streamed = responses
+    assert writer.call_count == 1
+    assert streamed.get_data() == buffered.get_data()
+    assert streamed.json["results"][0]["id"] == "recipe_id_0"
+
+
 @patch("werkzeug.datastructures.Headers.get")
 @patch("reciperadar.api.recipes.recrawl_search.delay")
 @patch("reciperadar.api.recipes.store_event")
@@ -113,6 +184,67 @@ def test_bot_search(query, store, recrawl, client):
     assert store.call_args[1]["event_data"]["suspected_bot"] is True
 
 
+@patch("reciperadar.api.recipes.recrawl_search.delay")
+@patch("reciperadar.api.recipes.store_event")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_search_sparse_fields(search, synonyms, store, recrawl, client, raw_recipe_hit):
+    search.return_value = {
+        "hits": {"hits": [raw_recipe_hit], "total": {"value": 1}},
+        "aggregations": {"prefilter": {"doc_count": 1}},
+    }
+    synonyms.return_value = {}
+
+    response = client.get(
+        path="/recipes/search",
+        query_string={"ingredients[]": ["one"], "fields": "title,time"},
+    )
+
+    page_body = search.call_args[1]["body"]
+    assert page_body["_source"] == ["id", "indexed_at", "title", "time"]
+    assert response.json["results"] == [
+        {"id": "recipe_id_0", "title": "Test Recipe", "time": 30}
+    ]
+
+
+@patch.object(RecipeSearch, "facets")
+def test_search_facets(facets, client):
+    facets.return_value = {"authority": "api", "facets": {"domains": []}}
+
+    response = client.get("/recipes/facets?ingredients[]=tomato&domains[]=-a.test")
+
+    assert response.json == facets.return_value
+    assert facets.call_args[1]["ingredients"] == [
+        EntityClause(term="tomato", positive=True)
+    ]
+    assert facets.call_args[1]["domains"] == [
+        EntityClause(term="a.test", positive=False)
+    ]
+
+
+@patch.object(Recipe.es, "get")
+def test_view_sparse_fields(get, client, raw_recipe_hit):
+    get.return_value = raw_recipe_hit
+
+    response = client.get("/recipes/recipe_id_0/view?fields=title")
+
+    assert get.call_args[1]["_source_includes"] == [
+        "id",
+        "indexed_at",
+        "title",
+        "redirected_id",
+    ]
+    assert response.json["results"] == [{"id": "recipe_id_0", "title": "Test Recipe"}]
+
+
+@patch.object(Recipe.es, "get")
+def test_view_invalid_fields(get, client):
+    response = client.get("/recipes/recipe_id_0/view?fields=invalid")
+
+    assert response.status_code == 400
+    assert not get.called
+
+
 @patch.object(Feedback, "register_report")
 @patch.object(Recipe, "get_by_id")
 @pytest.mark.parametrize(
@@ -162,3 +294,155 @@ def test_unsafe_content_report(get_recipe_by_id, register_report, client):
 
     assert register_report.called
     assert response.status_code == 200
+
+
+@patch("reciperadar.api.recipes.recrawl_search.delay")
+@patch("reciperadar.api.recipes.store_event.delay")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.msearch")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_batch_search(
+    search, msearch, synonyms, store, recrawl, client, raw_recipe_hit
+):
+    search_response = {
+        "hits": {"hits": [raw_recipe_hit], "total": {"value": 1}},
+        "aggregations": {
+            "prefilter": {
+                "doc_count": 1,
+                "domains": {"buckets": [{"key": "example.test", "doc_count": 1}]},
+            }
+        },
+    }
+    explore_response = {
+        "hits": {"hits": [], "total": {"value": 8}},
+        "aggregations": {
+            "prefilter": {
+                "doc_count": 8,
+                "domains": {"buckets": []},
+                "products": {
+                    "choices": {
+                        "singular": {
+                            "buckets": [
+                                {"key": "onion", "doc_count": 8},
+                                {"key": "garlic", "doc_count": 3},
+                            ]
+                        }
+                    }
+                },
+            }
+        },
+    }
+    search.side_effect = deepcopy([search_response, explore_response])
+    msearch.return_value = {"responses": deepcopy([search_response, explore_response])}
+    synonyms.return_value = {}
+
+    search_args = {"ingredients[]": ["tomato"], "sort": "duration", "offset": "500"}
+    explore_args = {"ingredients[]": ["tomato"]}
+    expected = [
+        client.get("/recipes/search", query_string=search_args).json,
+        client.get("/recipes/explore", query_string=explore_args).json,
+    ]
+    search_cache.clear()
+    ranking_cache.clear()
+
+    response = client.post(
+        path="/recipes/batch",
+        json=[
+            {"endpoint": "search", "args": search_args},
+            {"endpoint": "explore", "args": explore_args},
+        ],
+    )
+
+    assert response.status_code == 200
+    assert response.json == expected
+    assert msearch.call_count == 1
+    ranking, explore = msearch.call_args.kwargs["body"][1::2]
+    assert ranking["size"] == 250
+    assert explore["size"] == 0
+    assert msearch.call_args.kwargs["body"][2]["request_cache"] is True
+    assert store.call_count == 4
+
+
+@patch("reciperadar.api.recipes.recrawl_search.delay")
+@patch("reciperadar.api.recipes.store_event.delay")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.msearch")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_batch_search_cursor_expired(
+    search, msearch, synonyms, store, recrawl, client, raw_recipe_hit
+):
+    search_response = {
+        "hits": {"hits": [raw_recipe_hit], "total": {"value": 1}},
+        "aggregations": {"prefilter": {"doc_count": 1}},
+    }
+    search.return_value = search_response
+    msearch.return_value = {
+        "responses": [
+            {"status": 404, "error": {"type": "search_context_missing_exception"}},
+            search_response,
+        ]
+    }
+    synonyms.return_value = {}
+    cursor = SearchCursor("expired-pit", [3.0, "abc"], 0).encode()
+
+    response = client.post(
+        path="/recipes/batch",
+        json=[
+            {
+                "endpoint": "search",
+                "args": {"ingredients[]": "tomato", "cursor": cursor},
+            },
+            {"endpoint": "search", "args": {"ingredients[]": "tomato"}},
+        ],
+    )
+
+    assert response.status_code == 200
+    expired, results = response.json
+    assert expired == {"status": 410}
+    assert results["results"][0]["id"] == "recipe_id_0"
+    assert store.call_count == 1
+
+
+@patch("reciperadar.api.recipes.store_event.delay")
+@patch.object(RecipeSearch, "multi_query")
+def test_batch_search_failures(multi_query, store, client):
+    multi_query.return_value = [
+        TransportError(429, "too_many_requests"),
+        ConnectionError("N/A", "connection refused", None),
+        {"authority": "api", "total": 0, "results": [], "facets": {}},
+    ]
+
+    response = client.post(
+        path="/recipes/batch",
+        json=[{"endpoint": "explore", "args": {}}] * 3,
+    )
+
+    # each failed search is reported without failing the others
+    assert response.status_code == 200
+    throttled, unavailable, results = response.json
+    assert throttled == {"status": 429}
+    assert unavailable == {"status": 502}
+    assert results["results"] == []
+    assert store.call_count == 1
+
+
+@patch.object(RecipeSearch, "multi_query")
+@pytest.mark.parametrize(
+    "batch",
+    [
+        {},
+        [],
+        [{"endpoint": "report"}],
+        [{"endpoint": "search", "args": {"sort": "invalid"}}],
+        [{"endpoint": "search", "args": []}],
+        [{"endpoint": "search", "args": {"fields": 123}}],
+        [{"endpoint": "search", "args": {"ingredients[]": [5]}}],
+        [{"endpoint": "explore", "args": {"ingredients[]": [{"a": 1}]}}],
+        [{"endpoint": "search"}] * 11,
+    ],
+)
+def test_batch_search_invalid(multi_query, client, batch):
+    response = client.post(path="/recipes/batch", json=batch)
+
+    assert response.status_code == 400
+    assert not multi_query.called
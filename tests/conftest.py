@@ -1,6 +1,10 @@
 import pytest
 
 from reciperadar import app
+from reciperadar.models.recipes.fragments import fragment_cache
+from reciperadar.search.equipment import equipment_candidates
+from reciperadar.search.ingredients import ingredient_candidates, missing_indices
+from reciperadar.search.recipes import ranking_cache, search_cache
 
 
 @pytest.fixture
@@ -95,3 +99,13 @@ def raw_recipe_hit():
         },
         "inner_hits": {"ingredients": {"hits": {"hits": []}}},
     }
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    search_cache.clear()
+    ranking_cache.clear()
+    fragment_cache.clear()
+    equipment_candidates.clear()
+    ingredient_candidates.clear()
+    missing_indices.clear()
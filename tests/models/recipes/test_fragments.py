@@ -0,0 +1,74 @@
+from unittest.mock import Mock
+
+import pytest
+
+from reciperadar import app
+from reciperadar.models.recipes.fragments import RecipeFragment, render_recipe
+from reciperadar.models.recipes.views import RecipeView
+from reciperadar.search.base import EntityClause
+from reciperadar.utils.metrics import metrics
+
+
+def _render(doc, ingredients=None):
+    load = Mock(side_effect=lambda: RecipeView.from_doc(doc))
+    rendered = render_recipe(
+        recipe_id=doc["id"],
+        indexed_at=doc.get("indexed_at"),
+        load=load,
+        ingredients=ingredients,
+    )
+    return rendered, load
+
+
+@pytest.mark.parametrize("ingredients", [None, ["one"], ["two", "-one"]])
+def test_fragment_encoding(raw_recipe_hit, ingredients):
+    doc = raw_recipe_hit["_source"]
+    clauses = EntityClause.from_args(ingredients) if ingredients else None
+    expected = RecipeView.from_doc(doc).to_dict(clauses)
+
+    _render(doc)
+    rendered, load = _render(doc, clauses)
+
+    assert isinstance(rendered, RecipeFragment)
+    assert not load.called
+    assert rendered["id"] == doc["id"]
+    assert dict(rendered) == expected
+    assert app.json.dumps([rendered], separators=(",", ":")) == app.json.dumps(
+        [expected], separators=(",", ":")
+    )
+
+
+def test_fragment_cache_metrics(raw_recipe_hit):
+    doc = raw_recipe_hit["_source"]
+    labels = {"result": "hit"}
+    hits = metrics.value("recipe_fragment_requests_total", labels)
+    saved = metrics.value("recipe_fragment_bytes_saved_total")
+
+    _render(doc)
+    second, _ = _render(doc)
+
+    assert metrics.value("recipe_fragment_requests_total", labels) == hits + 1
+    assert metrics.value("recipe_fragment_bytes_saved_total") == (
+        saved + second.template.size
+    )
+
+
+def test_fragment_reencoded_after_indexing(raw_recipe_hit):
+    doc = raw_recipe_hit["_source"]
+    _render(doc)
+
+    updated = {**doc, "title": "Updated Recipe", "indexed_at": "2024-01-01T00:00:00"}
+    rendered, load = _render(updated)
+
+    assert load.called
+    assert rendered["title"] == "Updated Recipe"
+
+
+def test_fragment_requires_indexed_at(raw_recipe_hit):
+    doc = dict(raw_recipe_hit["_source"])
+    del doc["indexed_at"]
+
+    rendered, load = _render(doc)
+
+    assert isinstance(rendered, dict)
+    assert load.called
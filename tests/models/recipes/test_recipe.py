@@ -1,4 +1,5 @@
 from reciperadar.models.recipes import Recipe
+from reciperadar.search.base import EntityClause
 
 
 def test_recipe_from_doc(raw_recipe_hit):
@@ -41,3 +42,36 @@ def test_nutrition_source(raw_recipe_hit):
     assert recipe.nutrition is not None
     assert "nutrition" in doc
     assert doc["nutrition"] is None
+
+
+def _project(doc, fields):
+    subfields = {}
+    for field in fields:
+        name, _, subfield = field.partition(".")
+        subfields.setdefault(name, []).append(subfield)
+
+    projection = {}
+    for name, nested in subfields.items():
+        if name not in doc:
+            continue
+        value = doc[name]
+        if all(nested):
+            if isinstance(value, list):
+                value = [_project(item, nested) for item in value]
+            else:
+                value = _project(value, nested)
+        projection[name] = value
+    return projection
+
+
+def test_recipe_source_fields(raw_recipe_hit):
+    doc = raw_recipe_hit["_source"]
+    projected = _project(doc, Recipe.SOURCE_FIELDS)
+
+    assert "directions" not in projected
+    assert "src" not in projected
+    assert "nutrition" not in projected["ingredients"][0]
+
+    include = EntityClause.from_args(["one"])
+    expected = Recipe.from_doc(doc).to_dict(include)
+    assert Recipe.from_doc(projected).to_dict(include) == expected
@@ -0,0 +1,26 @@
+import pytest
+
+from reciperadar.models.recipes import Recipe
+from reciperadar.models.recipes.views import RecipeView
+from reciperadar.search.base import EntityClause
+
+
+@pytest.mark.parametrize("ingredients", [None, ["one"], ["-one", "two"]])
+def test_recipe_view_representation(raw_recipe_hit, ingredients):
+    doc = raw_recipe_hit["_source"]
+    doc["nutrition_source"] = "crawler"
+    clauses = EntityClause.from_args(ingredients) if ingredients else None
+
+    expected = Recipe.from_doc(doc).to_dict(clauses)
+    actual = RecipeView.from_doc(doc).to_dict(clauses)
+
+    assert actual == expected
+    assert actual["nutrition"] is not None
+
+
+def test_recipe_view_slots(raw_recipe_hit):
+    recipe = RecipeView.from_doc(raw_recipe_hit["_source"])
+
+    assert not hasattr(recipe, "__dict__")
+    assert not hasattr(recipe.ingredients[0], "__dict__")
+    assert not hasattr(recipe.ingredients[0].product, "__dict__")
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from unittest.mock import patch
+
+import pytest
+from opensearchpy.exceptions import NotFoundError, RequestError
+
+from reciperadar.search.ingredients import IngredientSearch, ProductEntry
+from reciperadar.workers.recipes import (
+    build_product_autosuggest,
+    index_product_autosuggest,
+)
+
+
+class FakeIndices:
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def create(self, index, body):
+        if index in self.cluster.documents:
+            raise RequestError(400, "resource_already_exists_exception")
+        self.cluster.documents[index] = {}
+
+    def delete(self, index):
+        self.cluster.documents.pop(index)
+        self.cluster.aliases.pop(index, None)
+
+    def refresh(self, index):
+        self.cluster.refreshed.add(index)
+
+    def get_alias(self, name):
+        indices = {
+            index: {"aliases": {name: {}}}
+            for index, aliases in self.cluster.aliases.items()
+            if name in aliases
+        }
+        if not indices:
+            raise NotFoundError(404, "aliases_not_found_exception")
+        return indices
+
+    def update_aliases(self, body):
+        # Every action is validated before any is applied
+        for action in body["actions"]:
+            for change in action.values():
+                if change["index"] not in self.cluster.documents:
+                    raise NotFoundError(404, "index_not_found_exception")
+        for action in body["actions"]:
+            for operation, change in action.items():
+                aliases = self.cluster.aliases[change["index"]]
+                if operation == "add":
+                    aliases.add(change["alias"])
+                else:
+                    aliases.discard(change["alias"])
+
+
+class FakeOpenSearch:
+    """
+    A local stand-in for the index management operations of a search cluster
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.aliases = defaultdict(set)
+        self.refreshed = set()
+        self.indices = FakeIndices(self)
+        self.fail_bulk = False
+
+    def resolve(self, name):
+        if name in self.documents:
+            return name
+        for index, aliases in self.aliases.items():
+            if name in aliases:
+                return index
+        raise NotFoundError(404, "index_not_found_exception")
+
+    def bulk(self, index, body):
+        if self.fail_bulk:
+            return {"errors": True, "items": []}
+        for action, document in zip(body[::2], body[1::2]):
+            self.documents[index][action["index"]["_id"]] = document
+        return {"errors": False, "items": []}
+
+    @staticmethod
+    def matches(clause, document):
+        # Approximates the prefix clause, and the edge-ngram autocomplete
+        # match without fuzziness, of the autosuggest query
+        if "prefix" in clause:
+            ((field, prefix),) = clause["prefix"].items()
+            return any(name.startswith(prefix) for name in document[field])
+        ((field, match),) = clause["match"].items()
+        field, _ = field.split(".")
+        words = [word for name in document[field] for word in name.split()]
+        return all(
+            any(word.startswith(term) for word in words)
+            for term in match["query"].split()
+        )
+
+    def search(self, index, body):
+        index = self.resolve(index)
+        if index not in self.refreshed:
+            return {"hits": {"hits": []}}
+        clauses = body["query"]["bool"]["should"]
+        documents = sorted(
+            (
+                doc
+                for doc in self.documents[index].values()
+                if any(self.matches(clause, doc) for clause in clauses)
+            ),
+            key=lambda doc: (-doc["doc_count"], doc["id"]),
+        )
+        hits = [
+            {"_source": {field: doc[field] for field in body["_source"]}}
+            for doc in documents[: body["size"]]
+        ]
+        return {"hits": {"hits": hits}}
+
+
+@pytest.fixture
+def cluster():
+    cluster = FakeOpenSearch()
+    with patch("reciperadar.search.base.QueryRepository.es", cluster):
+        yield cluster
+
+
+def _products(*ids):
+    return [
+        ProductEntry(
+            id=id,
+            category="produce",
+            singular=id,
+            plural=f"{id}s",
+            doc_count=10 + idx,
+            plural_count=0,
+        )
+        for idx, id in enumerate(ids)
+    ]
+
+
+@patch.object(IngredientSearch, "products")
+def test_build_autosuggest_index(products, cluster):
+    products.return_value = _products("onion", "garlic") + [
+        ProductEntry("saffron", None, "saffron", None, doc_count=2, plural_count=0)
+    ]
+
+    index = IngredientSearch().build_autosuggest_index()
+
+    assert cluster.resolve("product_autosuggest") == index
+    assert cluster.documents[index]["onion"]["names"] == ["onion", "onions"]
+    assert "saffron" not in cluster.documents[index]
+
+    suggestions = IngredientSearch()._products("o")
+    assert [suggestion.id for suggestion in suggestions] == ["onion"]
+
+    suggestions = IngredientSearch()._products("garlics")
+    assert [suggestion.id for suggestion in suggestions] == ["garlic"]
+
+
+@patch.object(IngredientSearch, "products")
+def test_rebuild_swaps_alias(products, cluster):
+    products.return_value = _products("onion")
+    previous = IngredientSearch().build_autosuggest_index()
+
+    products.return_value = _products("onion", "garlic")
+    index = IngredientSearch().build_autosuggest_index()
+
+    assert index != previous
+    assert cluster.resolve("product_autosuggest") == index
+    assert list(cluster.documents) == [index]
+
+
+@patch.object(IngredientSearch, "products")
+def test_failed_build_keeps_previous_index(products, cluster):
+    products.return_value = _products("onion")
+    previous = IngredientSearch().build_autosuggest_index()
+
+    cluster.fail_bulk = True
+    with pytest.raises(Exception):
+        IngredientSearch().build_autosuggest_index()
+
+    assert cluster.resolve("product_autosuggest") == previous
+    assert list(cluster.documents) == [previous]
+
+
+@patch.object(IngredientSearch, "products")
+def test_unavailable_sweep_skips_build(products, cluster):
+    products.return_value = None
+
+    assert IngredientSearch().build_autosuggest_index() is None
+    assert not cluster.documents
+
+
+@patch.object(IngredientSearch, "build_autosuggest_index")
+def test_index_product_autosuggest_task(build):
+    index_product_autosuggest()
+
+    assert build.called
+
+
+@patch("reciperadar.workers.recipes.index_product_autosuggest.delay")
+def test_worker_startup_requests_build(delay):
+    build_product_autosuggest(sender=None)
+
+    assert delay.called
@@ -1,4 +1,4 @@
-from reciperadar.search.base import EntityClause
+from reciperadar.search.base import EntityClause, MatchContext
 
 
 def test_entity_clause_parsing():
@@ -35,3 +35,31 @@ def test_entity_clause_term_list_preserve_ordering():
     actual_results = EntityClause.term_list(clauses, synonyms=synonyms)
 
     assert expected_results == actual_results
+
+
+def test_entity_clause_term_groups():
+    args = ["coriander", "basil", "cilantro"]
+    clauses = EntityClause.from_args(args)
+    synonyms = {
+        "coriander": ["cilantro", "coriander"],
+        "cilantro": ["cilantro", "coriander"],
+    }
+
+    expected_results = [["cilantro", "coriander"], ["basil"]]
+    actual_results = EntityClause.term_groups(clauses, synonyms=synonyms)
+
+    assert expected_results == actual_results
+
+
+def test_match_context():
+    clauses = EntityClause.from_args(["coriander", "-garlic", "lime"])
+    synonyms = {"coriander": ["coriander", "cilantro"]}
+
+    match = MatchContext.of(clauses, synonyms)
+
+    assert match.include == {"coriander", "cilantro", "lime"}
+    assert match.matches(["fresh herbs", "cilantro"])
+    assert not match.matches(["garlic"])
+    assert not match.matches(None)
+    assert MatchContext.of(match) is match
+    assert not MatchContext.of(None).matches(["lime"])
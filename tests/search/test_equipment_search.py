@@ -0,0 +1,143 @@
+from unittest.mock import patch
+
+import pytest
+
+from reciperadar.search.equipment import EquipmentSearch, refresh_equipment_index
+from reciperadar.utils.segments import SharedSegment
+
+
+def _equipment_response(*names):
+    buckets = [{"key": name, "doc_count": 10} for name in names]
+    return {"aggregations": {"equipment": {"equipment": {"buckets": buckets}}}}
+
+
+@pytest.fixture(autouse=True)
+def refresher():
+    with patch("reciperadar.search.equipment.equipment_refresher") as refresher:
+        yield refresher
+
+
+@pytest.fixture(autouse=True)
+def index(tmp_path):
+    index = SharedSegment(str(tmp_path / "equipment_index"))
+    with patch("reciperadar.search.equipment.equipment_index", index):
+        yield index
+
+
+def _load(index, equipment):
+    index.write({name: [str(count)] for name, count in equipment})
+    index.reload()
+
+
+@pytest.fixture
+def loaded(index):
+    _load(index, [("pan", 20), ("pancake pan", 5), ("pans", 20), ("oven", 50)])
+    return index
+
+
+@pytest.mark.parametrize(
+    "prefix, expected",
+    [
+        ("pan", ["pan", "pans", "pancake pan"]),
+        ("panc", ["pancake pan"]),
+        ("ov", ["oven"]),
+        ("(((", []),
+    ],
+)
+def test_equipment_index_lookup(loaded, prefix, expected):
+    candidates = EquipmentSearch._indexed_candidates(prefix)
+
+    assert [candidate["key"] for candidate in candidates] == expected
+
+
+def test_equipment_index_limit(index):
+    _load(index, [(f"pan {idx}", idx % 3) for idx in range(20)])
+
+    candidates = EquipmentSearch._indexed_candidates("pan", limit=4)
+
+    assert [candidate["key"] for candidate in candidates] == [
+        "pan 11",
+        "pan 14",
+        "pan 17",
+        "pan 2",
+    ]
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_from_index(search, refresher, loaded):
+    suggestions = EquipmentSearch().autosuggest("Pan")
+
+    assert suggestions == [
+        {"equipment": "pan"},
+        {"equipment": "pans"},
+        {"equipment": "pancake pan"},
+    ]
+    assert refresher.start.called
+    assert not search.called
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_escapes_regex(search):
+    search.return_value = _equipment_response()
+
+    EquipmentSearch().autosuggest(".*(((")
+
+    aggregation = search.call_args.kwargs["body"]["aggregations"]["equipment"]
+    terms = aggregation["aggregations"]["equipment"]["terms"]
+    assert terms["include"] == r"\.\*\(\(\(.*"
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_narrows_complete_results(search):
+    search.return_value = _equipment_response("pan", "pans", "pancake pan")
+
+    EquipmentSearch().autosuggest("pan")
+    suggestions = EquipmentSearch().autosuggest("panc")
+
+    assert suggestions == [{"equipment": "pancake pan"}]
+    assert search.call_count == 1
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_incomplete_results(search):
+    names = [f"pan {idx}" for idx in range(10)]
+    search.return_value = _equipment_response(*names)
+
+    EquipmentSearch().autosuggest("pan")
+    EquipmentSearch().autosuggest("pan ")
+
+    assert search.call_count == 2
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_equipment_sweep(search):
+    search.side_effect = [
+        {
+            "aggregations": {
+                "equipment": {
+                    "buckets": [{"key": {"name": "oven"}, "doc_count": 50}],
+                    "after_key": {"name": "oven"},
+                }
+            }
+        },
+        {"aggregations": {"equipment": {"buckets": []}}},
+    ]
+
+    assert EquipmentSearch().equipment() == {"oven": ["50"]}
+    composite = search.call_args.kwargs["body"]["aggregations"]["equipment"]
+    assert composite["composite"]["after"] == {"name": "oven"}
+
+
+@patch.object(EquipmentSearch, "equipment")
+def test_equipment_index_refresh(equipment, refresher, index):
+    equipment.return_value = {"oven": ["50"]}
+    refresher.jitter = 0.1
+
+    assert refresh_equipment_index()
+    assert not refresh_equipment_index()
+
+    assert equipment.call_count == 1
+    assert index.reload()
+    assert EquipmentSearch._indexed_candidates("ov") == [
+        {"key": "oven", "doc_count": 50}
+    ]
@@ -0,0 +1,236 @@
+from unittest.mock import patch
+
+import pytest
+from opensearchpy.exceptions import NotFoundError
+
+from reciperadar.search.ingredients import (
+    IngredientSearch,
+    ProductDictionary,
+    ProductEntry,
+    refresh_product_dictionary,
+)
+
+
+@patch("reciperadar.search.ingredients.scan")
+def test_synonyms_paging(scan):
+    scan.return_value = iter(
+        {"_id": f"product-{idx}", "_source": {"synonyms": [f"synonym-{idx}"]}}
+        for idx in range(25000)
+    )
+
+    synonyms = IngredientSearch().synonyms()
+
+    assert len(synonyms) == 25000
+    assert synonyms["product-24999"] == ["synonym-24999"]
+
+
+@patch("reciperadar.search.ingredients.scan")
+def test_synonyms_unavailable(scan):
+    def partial_results():
+        yield {"_id": "product-0", "_source": {"synonyms": ["synonym-0"]}}
+        raise Exception("scroll expired")
+
+    scan.return_value = partial_results()
+
+    assert IngredientSearch().synonyms() is None
+
+
+def _product(id, singular, plural, doc_count=10, plural_count=0, category=None):
+    return ProductEntry(id, category, singular, plural, doc_count, plural_count)
+
+
+@pytest.fixture
+def dictionary():
+    dictionary = ProductDictionary()
+    dictionary.load(
+        [
+            _product("tomato", "tomato", "tomatoes", doc_count=50, plural_count=30),
+            _product("tomatillo", "tomatillo", "tomatillos", doc_count=8),
+            _product("cherry_tomato", "cherry tomato", "cherry tomatoes"),
+            _product("potato", "potato", "potatoes", doc_count=40),
+            _product("tom", "tom", "toms", doc_count=5),
+            _product("rare_tomato", "rare tomato", "rare tomatoes", doc_count=4),
+        ]
+    )
+    return dictionary
+
+
+@pytest.mark.parametrize(
+    "prefix, expected",
+    [
+        ("tom", ["tomato", "cherry_tomato", "tomatillo", "tom"]),
+        ("tomatoes", ["tomato", "potato", "cherry_tomato"]),
+        ("cherry tom", ["cherry_tomato"]),
+        ("potatp", ["potato"]),
+        ("toamto", ["tomato", "cherry_tomato", "tomatillo"]),
+        ("xyz", []),
+    ],
+)
+def test_product_dictionary_lookup(dictionary, prefix, expected):
+    assert [product.id for product in dictionary.lookup(prefix)] == expected
+
+
+def test_product_dictionary_unloaded():
+    assert ProductDictionary().lookup("tom") is None
+
+
+@patch("reciperadar.search.ingredients.product_refresher")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_from_dictionary(search, refresher, dictionary):
+    with patch("reciperadar.search.ingredients.product_dictionary", dictionary):
+        suggestions = IngredientSearch().autosuggest("Tom")
+
+    assert [suggestion["name"] for suggestion in suggestions] == [
+        "tom",
+        "tomatoes",
+        "tomatillo",
+        "cherry tomato",
+    ]
+    assert refresher.start.called
+    assert not search.called
+
+
+@patch("reciperadar.search.ingredients.product_refresher")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_fallback(search, refresher):
+    product = _product("tomato", "tomato", "tomatoes", doc_count=50, plural_count=30)
+    search.return_value = {"hits": {"hits": [{"_source": product._asdict()}]}}
+
+    with patch(
+        "reciperadar.search.ingredients.product_dictionary", ProductDictionary()
+    ):
+        suggestions = IngredientSearch().autosuggest("tomato")
+        IngredientSearch().autosuggest("tomato")
+        IngredientSearch().autosuggest("tomatoe")
+
+    assert suggestions == [
+        {
+            "id": "tomato",
+            "name": "tomatoes",
+            "category": None,
+            "singular": "tomato",
+            "plural": "tomatoes",
+        }
+    ]
+    assert search.call_args.kwargs["index"] == "product_autosuggest"
+
+    # fuzzy results are cached per prefix, and are not narrowed
+    assert search.call_count == 2
+
+
+@patch("reciperadar.search.ingredients.product_refresher")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_autosuggest_aggregation_fallback(search, refresher):
+    aggregations = {
+        "aggregations": {
+            "ingredients": {
+                "products": {
+                    "product_id": {
+                        "buckets": [
+                            {
+                                "key": "tomato",
+                                "doc_count": 50,
+                                "plurality": {"doc_count": 30},
+                                "category": {"buckets": [{"key": "produce"}]},
+                                "singular": {"buckets": [{"key": "tomato"}]},
+                                "plural": {"buckets": [{"key": "tomatoes"}]},
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+
+    def search_index(index, body):
+        if index == "product_autosuggest":
+            raise NotFoundError(404, "index_not_found_exception")
+        return aggregations
+
+    search.side_effect = search_index
+
+    with patch(
+        "reciperadar.search.ingredients.product_dictionary", ProductDictionary()
+    ):
+        suggestions = IngredientSearch().autosuggest("tomato")
+        IngredientSearch().autosuggest("onion")
+
+    assert suggestions == [
+        {
+            "id": "tomato",
+            "name": "tomatoes",
+            "category": "produce",
+            "singular": "tomato",
+            "plural": "tomatoes",
+        }
+    ]
+
+    # the missing alias is not queried again by later fallback lookups
+    indices = [call.kwargs["index"] for call in search.call_args_list]
+    assert indices == ["product_autosuggest", "recipes", "recipes"]
+
+
+def _composite_page(*product_ids):
+    buckets = [
+        {
+            "key": {"product_id": product_id},
+            "doc_count": 10,
+            "plurality": {"doc_count": 0},
+            "category": {"buckets": []},
+            "singular": {"buckets": [{"key": product_id}]},
+            "plural": {"buckets": []},
+        }
+        for product_id in product_ids
+    ]
+    products = {"buckets": buckets}
+    if buckets:
+        products["after_key"] = buckets[-1]["key"]
+    return {"aggregations": {"ingredients": {"products": products}}}
+
+
+@patch("reciperadar.search.ingredients.scan")
+def test_dictionary_loaded_from_autosuggest_index(scan):
+    product = _product("tomato", "tomato", "tomatoes")
+    scan.return_value = iter([{"_source": product._asdict()}])
+    dictionary = ProductDictionary()
+
+    with patch("reciperadar.search.ingredients.product_dictionary", dictionary):
+        refresh_product_dictionary()
+
+    assert scan.call_args.kwargs["index"] == "product_autosuggest"
+    assert dictionary.lookup("tom") == [product]
+    assert dictionary.loaded_at is not None
+
+
+@patch("reciperadar.search.ingredients.scan")
+def test_dictionary_unloaded_without_autosuggest_index(scan):
+    scan.side_effect = NotFoundError(404, "index_not_found_exception")
+    dictionary = ProductDictionary()
+
+    with patch("reciperadar.search.ingredients.product_dictionary", dictionary):
+        refresh_product_dictionary()
+
+    assert dictionary.lookup("tom") is None
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_products_sweep(search):
+    search.side_effect = [
+        _composite_page("garlic", "onion"),
+        _composite_page("tomato"),
+        _composite_page(),
+    ]
+
+    products = IngredientSearch().products()
+
+    assert [product.id for product in products] == ["garlic", "onion", "tomato"]
+    aggregation = search.call_args.kwargs["body"]["aggregations"]["ingredients"]
+    composite = aggregation["aggregations"]["products"]["composite"]
+    assert composite["after"] == {"product_id": "tomato"}
+
+
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_products_sweep_unavailable(search):
+    search.side_effect = [_composite_page("garlic"), Exception("timeout")]
+
+    assert IngredientSearch().products() is None
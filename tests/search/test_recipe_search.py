@@ -0,0 +1,686 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from hypothesis import given, strategies as st
+from opensearchpy.exceptions import NotFoundError
+
+from reciperadar.models.recipes import Recipe
+from reciperadar.search.base import EntityClause
+from reciperadar.search.recipes import (
+    RecipeSearch,
+    SearchCursor,
+    load_ingredient_synonyms,
+    refresh_ingredient_synonyms,
+)
+
+
+def _search_response(hits, doc_count):
+    return {
+        "hits": {"hits": hits, "total": {"value": len(hits)}},
+        "aggregations": {
+            "prefilter": {
+                "doc_count": doc_count,
+                "domains": {"buckets": []},
+            }
+        },
+    }
+
+
+def _planning_response(*doc_counts):
+    buckets = {str(idx): {"doc_count": count} for idx, count in enumerate(doc_counts)}
+    return {"aggregations": {"refinements": {"buckets": buckets}}}
+
+
+def _query(ingredients, offset=0, limit=10, **kwargs):
+    return RecipeSearch().query(
+        ingredients=EntityClause.from_args(ingredients),
+        equipment=[],
+        offset=offset,
+        limit=limit,
+        sort=None,
+        domains=[],
+        dietary_properties=[],
+        **kwargs,
+    )
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_single_ingredient_skips_planning(search, synonyms, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    results = _query(["tomato"])
+
+    assert search.call_count == 2
+    assert results["refinements"] == []
+
+
+@pytest.mark.parametrize(
+    "doc_counts, min_include_match, refinement",
+    [
+        ((10, 20, 30), 3, None),
+        ((0, 5, 30), 2, "match_any"),
+        ((0, 0, 3), 1, "match_any"),
+    ],
+)
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_refinement_planning(
+    search,
+    synonyms,
+    doc_counts,
+    min_include_match,
+    refinement,
+    raw_recipe_hit,
+):
+    search.side_effect = [
+        _planning_response(*doc_counts),
+        _search_response([raw_recipe_hit], doc_count=doc_counts[0]),
+        _search_response([raw_recipe_hit], doc_count=0),
+    ]
+    synonyms.return_value = {}
+
+    results = _query(["tomato", "onion", "garlic"])
+
+    assert search.call_count == 3
+    planning_body = search.call_args_list[0].kwargs["body"]
+    assert planning_body["size"] == 0
+    assert len(planning_body["aggs"]["refinements"]["filters"]["filters"]) == 3
+
+    query = search.call_args_list[1].kwargs["body"]["query"]
+    bool_query = query["function_score"]["query"]["bool"]
+    assert bool_query["minimum_should_match"] == min_include_match
+    assert results["refinements"] == ([refinement] if refinement else [])
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_synonym_expansions_grouped(search, synonyms, raw_recipe_hit):
+    search.side_effect = [
+        _planning_response(10, 20),
+        _search_response([raw_recipe_hit], doc_count=10),
+        _search_response([raw_recipe_hit], doc_count=0),
+    ]
+    synonyms.return_value = {"coriander": ["coriander", "cilantro", "dhania"]}
+
+    _query(["coriander", "lime"])
+
+    planning_body = search.call_args_list[0].kwargs["body"]
+    assert len(planning_body["aggs"]["refinements"]["filters"]["filters"]) == 2
+
+    query = search.call_args_list[1].kwargs["body"]["query"]
+    bool_query = query["function_score"]["query"]["bool"]
+    assert bool_query["minimum_should_match"] == 2
+    coriander, lime = [x["constant_score"] for x in bool_query["should"]]
+    assert coriander["boost"] == 2
+    assert coriander["filter"]["bool"]["should"] == [
+        {"match": {"contents": "coriander"}},
+        {"match": {"contents": "cilantro"}},
+        {"match": {"contents": "dhania"}},
+    ]
+    assert lime == {"boost": 1, "filter": {"match": {"contents": "lime"}}}
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_refinement_disallowed(search, synonyms, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=0)
+    synonyms.return_value = {}
+
+    _query(["tomato", "onion"], allow_refinement=False)
+
+    # a ranking request, followed by a request for the page of results
+    assert search.call_count == 2
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_search_caching(search, synonyms, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    first = _query(["tomato", "-garlic"])
+    second = _query(["tomato", "-garlic"])
+    _query(["-garlic", "tomato"])
+
+    assert first == second
+    assert search.call_count == 4
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_ranked_page_turns(search, synonyms, raw_recipe_hit):
+    ranked = [{"_id": f"recipe-{idx}"} for idx in range(30)]
+    pages = [
+        _paged_hits(raw_recipe_hit, *[hit["_id"] for hit in ranked[:10]]),
+        _paged_hits(raw_recipe_hit, *[hit["_id"] for hit in ranked[10:20]]),
+    ]
+    search.side_effect = [
+        _search_response(ranked, doc_count=30),
+        _search_response(pages[0], doc_count=0),
+        _search_response(pages[1], doc_count=0),
+    ]
+    synonyms.return_value = {}
+
+    first = _query(["tomato"])
+    second = _query(["tomato"], offset=10)
+
+    ranking_body = search.call_args_list[0].kwargs["body"]
+    assert ranking_body["size"] == 250
+    assert ranking_body["_source"] is False
+
+    # later pages are retrieved by id, without ranking or aggregation
+    page_body = search.call_args_list[2].kwargs["body"]
+    assert page_body == {
+        "query": {"ids": {"values": [hit["_id"] for hit in ranked[10:20]]}},
+        "size": 10,
+        "_source": Recipe.SOURCE_FIELDS,
+    }
+    assert [result["id"] for result in second["results"]] == [
+        hit["_id"] for hit in ranked[10:20]
+    ]
+    assert second["facets"] == first["facets"]
+    assert second["total"] == 30
+    assert search.call_count == 3
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_facets_computed_when_required(search, synonyms, raw_recipe_hit):
+    ranked = [{"_id": f"recipe-{idx}"} for idx in range(20)]
+    pages = [
+        _paged_hits(raw_recipe_hit, *[hit["_id"] for hit in ranked[:10]]),
+        _paged_hits(raw_recipe_hit, *[hit["_id"] for hit in ranked[10:20]]),
+    ]
+    search.side_effect = [
+        {"hits": {"hits": ranked, "total": {"value": 20}}},
+        {"hits": {"hits": pages[0], "total": {"value": 20}}},
+        _search_response([], doc_count=20),
+        _search_response(pages[1], doc_count=0),
+    ]
+    synonyms.return_value = {}
+
+    first = _query(["tomato"], facets=False)
+    second = _query(["tomato"], offset=10)
+
+    ranking_body = search.call_args_list[0].kwargs["body"]
+    assert ranking_body["aggs"] == {}
+    assert first["facets"] == {}
+
+    # the facets are computed without ranking the results again
+    facets_body = search.call_args_list[2].kwargs["body"]
+    assert facets_body["size"] == 0
+    assert "prefilter" in facets_body["aggs"]
+    assert second["facets"] == {"domains": []}
+    assert search.call_count == 4
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_facets_only(search, synonyms):
+    search.return_value = _search_response([], doc_count=5)
+    synonyms.return_value = {}
+
+    results = RecipeSearch().facets(
+        ingredients=EntityClause.from_args(["tomato"]),
+        equipment=[],
+        sort=None,
+        domains=[],
+        dietary_properties=[],
+    )
+    RecipeSearch().facets(
+        ingredients=EntityClause.from_args(["tomato"]),
+        equipment=[],
+        sort=None,
+        domains=[],
+        dietary_properties=[],
+    )
+
+    body = search.call_args.kwargs["body"]
+    assert body["size"] == 0
+    assert "sort" not in body
+    assert results == {"authority": "api", "facets": {"domains": []}}
+    assert search.call_count == 1
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_explore_product_choices(search, synonyms):
+    counts = {"onion": 8, "basil": 5, "lemon": 4, "garlic": 3, "thyme": 1}
+    products = [{"key": key, "doc_count": count} for key, count in counts.items()]
+    explore_response = _search_response([], doc_count=8)
+    explore_response["aggregations"]["prefilter"]["products"] = {
+        "choices": {"singular": {"buckets": products}}
+    }
+    search.return_value = explore_response
+    synonyms.return_value = {}
+
+    results = RecipeSearch().explore(
+        ingredients=EntityClause.from_args(["tomato"]),
+        dietary_properties=[],
+    )
+
+    # a single request, which the shard request cache can serve
+    assert search.call_count == 1
+    assert search.call_args.kwargs["request_cache"] is True
+    assert search.call_args.kwargs["body"]["size"] == 0
+
+    # products found in every result do not divide them, and are omitted
+    assert [product["key"] for product in results["facets"]["products"]] == [
+        "lemon",
+        "basil",
+        "garlic",
+        "thyme",
+    ]
+
+
+@pytest.mark.parametrize("stored", [True, False])
+@patch("reciperadar.search.recipes.load_sort_scripts")
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_sort_scripts(search, synonyms, sort_scripts, stored, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+    sort_scripts.return_value = stored
+
+    _query(["tomato"])
+
+    query = search.call_args_list[0].kwargs["body"]["query"]
+    script = query["function_score"]["script_score"]["script"]
+    assert ("id" in script) is stored
+    assert ("source" in script) is not stored
+    assert script["params"] == {
+        "score_limit": 2.0,
+        "exact": False,
+        "invert": False,
+    }
+
+
+@patch("reciperadar.search.base.QueryRepository.es.put_script")
+@patch("reciperadar.search.base.QueryRepository.es.get_script")
+def test_sort_script_registration(get_script, put_script):
+    scripts = RecipeSearch.sort_scripts()
+    registered = {scripts["relevance"][0]}
+
+    def _get_script(id):
+        if id not in registered:
+            raise NotFoundError(404, "resource_not_found_exception")
+
+    get_script.side_effect = _get_script
+
+    assert RecipeSearch().register_sort_scripts()
+    assert put_script.call_count == 2
+    assert {call.kwargs["id"] for call in put_script.call_args_list} == {
+        scripts["ingredients"][0],
+        scripts["duration"][0],
+    }
+
+
+@patch("reciperadar.search.base.QueryRepository.es.get_script")
+def test_sort_script_registration_failure(get_script):
+    get_script.side_effect = ConnectionError("unavailable")
+
+    assert not RecipeSearch().register_sort_scripts()
+
+
+@pytest.mark.parametrize(
+    "sort, invert",
+    [
+        ("relevance", False),
+        ("ingredients", True),
+        ("duration", True),
+    ],
+)
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_rescore_ranking(search, synonyms, sort, invert, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    RecipeSearch().query(
+        ingredients=EntityClause.from_args(["tomato"]),
+        equipment=[],
+        offset=240,
+        limit=25,
+        sort=sort,
+        domains=[],
+        dietary_properties=[],
+        ranking="rescore",
+    )
+
+    body = search.call_args_list[0].kwargs["body"]
+    assert "bool" in body["query"]
+    assert body["sort"] == [{"_score": "desc"}]
+    assert body["rescore"]["window_size"] == 250
+
+    rescore_query = body["rescore"]["query"]["rescore_query"]
+    script = rescore_query["function_score"]["script_score"]["script"]
+    assert rescore_query["function_score"]["query"] == body["query"]
+    assert script["params"]["invert"] is invert
+
+
+@patch.dict("reciperadar.app.config", {"RESCORE_WINDOW": 100})
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_rescore_window_configurable(search, synonyms, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    _query(["tomato"], ranking="rescore")
+
+    # documents beyond the window keep their first-pass order
+    ranking_body = search.call_args_list[0].kwargs["body"]
+    assert ranking_body["size"] == 250
+    assert ranking_body["rescore"]["window_size"] == 100
+
+
+@pytest.mark.parametrize("sort", [None, "duration"])
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_rescore_ranking_without_ingredients(search, synonyms, sort, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    RecipeSearch().query(
+        ingredients=EntityClause.from_args(["-garlic"]),
+        equipment=[],
+        offset=0,
+        limit=10,
+        sort=sort,
+        domains=[],
+        dietary_properties=EntityClause.from_args(["is_vegan"]),
+        ranking="rescore",
+    )
+
+    # every document is ranked by the sort script
+    body = search.call_args_list[0].kwargs["body"]
+    assert "rescore" not in body
+    assert "function_score" in body["query"]
+
+
+@st.composite
+def match_sets(draw):
+    count = draw(st.integers(min_value=1, max_value=40))
+    matches = draw(st.lists(st.booleans(), min_size=count, max_size=count))
+    return count, matches
+
+
+def _encoded_score(count, matches):
+    # OpenSearch accumulates clause scores as single-precision floats
+    boosts = RecipeSearch._match_boosts(count)
+    score = np.float32(0)
+    for boost, matched in zip(boosts, matches):
+        if matched:
+            score = np.float32(score + np.float32(boost))
+    return score
+
+
+@given(match_sets(), st.booleans())
+def test_match_count_decoding(match_set, exact):
+    count, matches = match_set
+    score = _encoded_score(count, matches)
+
+    found, exact_found = RecipeSearch.decode_match_counts([score], exact)
+
+    expected = sum(matches[: RecipeSearch.MAX_ENCODED_MATCHES])
+    assert found[0] == expected
+    assert exact_found[0] == (expected if exact else 0)
+
+
+@given(match_sets(), match_sets())
+def test_match_encoding_prefers_earlier_terms(first, second):
+    count = min(first[0], second[0], RecipeSearch.MAX_ENCODED_MATCHES)
+    first_matches, second_matches = first[1][:count], second[1][:count]
+    first_score = _encoded_score(count, first_matches)
+    second_score = _encoded_score(count, second_matches)
+
+    # scores order match sets lexicographically, earliest terms first
+    assert (first_score > second_score) == (first_matches > second_matches)
+
+
+def _candidate(id, score, product_count, time, rating=4.0):
+    return {
+        "_id": id,
+        "_score": score,
+        "fields": {
+            "product_count": [product_count],
+            "time": [time],
+            "rating": [rating],
+        },
+    }
+
+
+@pytest.fixture
+def rerank_candidates():
+    return [
+        # tomato, onion, garlic: matches encoded as bits, tomato highest
+        _candidate("a", 0b001, product_count=3, time=60, rating=3.0),
+        _candidate("b", 0b111, product_count=8, time=20, rating=4.5),
+        _candidate("c", 0b110, product_count=2, time=45, rating=4.0),
+        _candidate("d", 0b011, product_count=5, time=15, rating=5.0),
+        _candidate("e", 0b100, product_count=1, time=30, rating=2.0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "sort, expected",
+    [
+        (None, ["b", "c", "d", "e", "a"]),
+        ("relevance", ["b", "c", "d", "e", "a"]),
+        ("ingredients", ["e", "c", "a", "d", "b"]),
+        ("duration", ["d", "b", "e", "c", "a"]),
+    ],
+)
+def test_rerank(rerank_candidates, sort, expected):
+    sort_params = RecipeSearch()._generate_sort_method(sort, 3, False)
+    ranking = RecipeSearch.rerank(rerank_candidates, sort_params)
+
+    assert [rerank_candidates[idx]["_id"] for idx in ranking] == expected
+
+
+@pytest.mark.parametrize("sort", [None, "duration"])
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_rerank_without_ingredients(search, synonyms, sort, raw_recipe_hit):
+    search.return_value = _search_response([raw_recipe_hit], doc_count=1)
+    synonyms.return_value = {}
+
+    RecipeSearch().query(
+        ingredients=EntityClause.from_args(["-garlic"]),
+        equipment=[],
+        offset=0,
+        limit=10,
+        sort=sort,
+        domains=[],
+        dietary_properties=EntityClause.from_args(["is_vegan"]),
+        ranking="rerank",
+    )
+
+    # every document is ranked by the sort script, rather than a sample
+    ranking_body = search.call_args_list[0].kwargs["body"]
+    assert "docvalue_fields" not in ranking_body
+    assert ranking_body["size"] == 250
+    assert "function_score" in ranking_body["query"]
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_rerank_search(search, synonyms, rerank_candidates, raw_recipe_hit):
+    candidates = _search_response(rerank_candidates, doc_count=5)
+    page = [
+        {
+            **raw_recipe_hit,
+            "_id": id,
+            "_source": {**raw_recipe_hit["_source"], "id": id},
+        }
+        for id in ["a", "c"]
+    ]
+    search.side_effect = [
+        _planning_response(1, 5),
+        candidates,
+        _search_response(page, 0),
+    ]
+    synonyms.return_value = {}
+
+    results = RecipeSearch().query(
+        ingredients=EntityClause.from_args(["tomato", "onion", "garlic"]),
+        equipment=[],
+        offset=1,
+        limit=2,
+        sort="ingredients",
+        domains=[],
+        dietary_properties=[],
+        ranking="rerank",
+    )
+
+    candidates_body = search.call_args_list[1].kwargs["body"]
+    assert candidates_body["_source"] is False
+    assert candidates_body["size"] == 250
+
+    page_body = search.call_args_list[2].kwargs["body"]
+    assert page_body["query"] == {"ids": {"values": ["c", "a"]}}
+    assert [result["id"] for result in results["results"]] == ["c", "a"]
+    assert results["total"] == 5
+
+
+@patch("reciperadar.search.recipes.synonym_refresher")
+@patch("reciperadar.search.recipes.refresh_ingredient_synonyms")
+@patch("reciperadar.search.recipes.ingredient_synonyms")
+def test_synonyms_served_while_stale(segment, refresh, refresher):
+    segment.loaded_at = datetime.now(tz=UTC) - timedelta(days=1)
+    segment.reload.return_value = True
+
+    synonyms = load_ingredient_synonyms()
+
+    assert synonyms is segment
+    refresher.start.assert_called_once()
+    refresh.assert_not_called()
+
+
+@patch("reciperadar.search.recipes.synonym_refresher")
+@patch("reciperadar.search.recipes.refresh_ingredient_synonyms")
+@patch("reciperadar.search.recipes.ingredient_synonyms")
+def test_synonyms_built_when_missing(segment, refresh, refresher):
+    segment.loaded_at = None
+    segment.reload.return_value = False
+
+    synonyms = load_ingredient_synonyms()
+
+    assert synonyms is None
+    refresh.assert_called_once()
+
+
+@patch("reciperadar.search.recipes.ingredient_synonyms")
+def test_synonyms_expire_by_earliest_refresh(segment):
+    refresh_ingredient_synonyms()
+
+    # a segment written one jittered interval ago is rebuilt
+    _, expiry = segment.rebuild.call_args.args
+    written_at = datetime.now(tz=UTC) - timedelta(minutes=55)
+    assert written_at < expiry
+
+
+def _paged_hits(raw_recipe_hit, *ids):
+    return [
+        {
+            **raw_recipe_hit,
+            "_id": id,
+            "_source": {**raw_recipe_hit["_source"], "id": id},
+            "sort": [3.0, id],
+        }
+        for id in ids
+    ]
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.delete_pit")
+@patch("reciperadar.search.base.QueryRepository.es.create_pit")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_cursor_paging(search, create_pit, delete_pit, synonyms, raw_recipe_hit):
+    create_pit.return_value = {"pit_id": "pit-1"}
+    synonyms.return_value = {}
+
+    search.return_value = _search_response(
+        _paged_hits(raw_recipe_hit, "a", "b"), doc_count=3
+    )
+    first = _query(["tomato"], limit=2, cursor="")
+
+    body = search.call_args.kwargs["body"]
+    assert search.call_args.kwargs["index"] is None
+    assert body["pit"]["id"] == "pit-1"
+    assert body["sort"][-1] == {"id": "asc"}
+    assert "from" not in body and "search_after" not in body
+    assert "aggs" in body
+    assert SearchCursor.decode(first["cursor"]) == ("pit-1", [3.0, "b"], 0)
+
+    search.return_value = {"hits": {"hits": _paged_hits(raw_recipe_hit, "c")}}
+    search.return_value["hits"]["total"] = {"value": 3}
+    second = _query(["tomato"], limit=2, cursor=first["cursor"])
+
+    body = search.call_args.kwargs["body"]
+    assert body["search_after"] == [3.0, "b"]
+    assert "aggs" not in body
+    assert [result["id"] for result in second["results"]] == ["c"]
+    assert second["cursor"] is None
+    create_pit.assert_called_once()
+    delete_pit.assert_called_once_with(body={"pit_id": ["pit-1"]})
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.create_pit")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_cursor_resumes_refinement(search, create_pit, synonyms, raw_recipe_hit):
+    search.return_value = _search_response(
+        _paged_hits(raw_recipe_hit, "a", "b"), doc_count=3
+    )
+    synonyms.return_value = {}
+    cursor = SearchCursor("pit-1", [1.0, "z"], 1).encode()
+
+    results = _query(["tomato", "onion"], limit=2, cursor=cursor)
+
+    # the refinement selected for the first page applies without planning
+    assert search.call_count == 1
+    query = search.call_args.kwargs["body"]["query"]
+    assert query["function_score"]["query"]["bool"]["minimum_should_match"] == 1
+    assert results["refinements"] == ["match_any"]
+    assert not create_pit.called
+
+
+def test_cursor_invalid():
+    with pytest.raises(ValueError):
+        SearchCursor.decode("not-a-cursor")
+
+
+@patch("reciperadar.search.recipes.load_ingredient_synonyms")
+@patch("reciperadar.search.base.QueryRepository.es.msearch")
+@patch("reciperadar.search.base.QueryRepository.es.search")
+def test_multi_query_isolates_failures(search, msearch, synonyms, raw_recipe_hit):
+    response = _search_response([raw_recipe_hit], doc_count=1)
+    search.return_value = response
+    msearch.return_value = {
+        "responses": [
+            {"status": 404, "error": {"type": "search_context_missing_exception"}},
+            response,
+        ]
+    }
+    synonyms.return_value = {}
+    params = {
+        "ingredients": EntityClause.from_args(["tomato"]),
+        "equipment": [],
+        "offset": 0,
+        "limit": 10,
+        "sort": None,
+        "domains": [],
+        "dietary_properties": [],
+    }
+    cursor = SearchCursor("expired-pit", [3.0, "abc"], 0).encode()
+
+    expired, results = RecipeSearch().multi_query(
+        [{**params, "cursor": cursor}, params]
+    )
+
+    assert isinstance(expired, NotFoundError)
+    assert [result["id"] for result in results["results"]] == ["recipe_id_0"]
@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+from reciperadar.utils.cache import PrefixCache, ResultCache
+
+
+def test_cache_eviction():
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_cache_size_eviction():
+    cache = ResultCache(maxsize=10, ttl=60, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.set("a", "xxx")
+    cache.set("c", "xxxxx")
+    cache.set("d", "x" * 11)
+
+    assert cache.get("a") == "xxx"
+    assert cache.get("b") is None
+    assert cache.get("c") == "xxxxx"
+    assert cache.get("d") is None
+    assert cache.size == 8
+
+
+@patch("reciperadar.utils.cache.monotonic")
+def test_cache_expiry(monotonic):
+    cache = ResultCache(maxsize=2, ttl=60)
+    monotonic.return_value = 100
+    cache.set("a", 1)
+
+    monotonic.return_value = 159
+    assert cache.get("a") == 1
+
+    monotonic.return_value = 160
+    assert cache.get("a") is None
+
+
+@patch("reciperadar.utils.cache.monotonic")
+def test_cache_generation_change(monotonic):
+    generations = iter(["first", "first", "second"])
+    cache = ResultCache(
+        maxsize=2,
+        ttl=600,
+        generation=lambda: next(generations),
+        generation_interval=60,
+    )
+    monotonic.return_value = 0
+    assert cache.get("a") is None
+
+    cache.set("a", 1)
+    monotonic.return_value = 30
+    assert cache.get("a") == 1
+
+    monotonic.return_value = 60
+    assert cache.get("a") == 1
+
+    monotonic.return_value = 120
+    assert cache.get("a") is None
+
+
+def _narrow(candidates, prefix):
+    return [candidate for candidate in candidates if candidate.startswith(prefix)]
+
+
+def test_prefix_cache_narrowing():
+    cache = PrefixCache("test", maxsize=10, ttl=60, limit=3, narrow=_narrow)
+    cache.set("to", ["tomato", "tofu"])
+
+    assert cache.lookup("tom") == ["tomato"]
+    assert cache.lookup("tomx") == []
+    assert cache.get("tom") == ["tomato"]
+
+
+def test_prefix_cache_incomplete():
+    cache = PrefixCache("test", maxsize=10, ttl=60, limit=2, narrow=_narrow)
+    cache.set("to", ["tomato", "tofu"])
+
+    assert cache.lookup("to") == ["tomato", "tofu"]
+    assert cache.lookup("tom") is None
+
+
+def test_prefix_cache_without_narrowing():
+    cache = PrefixCache("test", maxsize=10, ttl=60, limit=3)
+    cache.set("to", ["tomato", "tofu"])
+
+    assert cache.lookup("to") == ["tomato", "tofu"]
+    assert cache.lookup("tom") is None
@@ -0,0 +1,58 @@
+import pytest
+from hypothesis import given, strategies as st
+
+from reciperadar.utils.fuzzy import FuzzyPrefixIndex, prefix_distance
+
+
+@pytest.mark.parametrize(
+    "term, word, distance",
+    [
+        ("tom", "tomato", 0),
+        ("tomato", "tomato", 0),
+        ("tmo", "tomato", 1),
+        ("otmato", "tomato", 1),
+        ("tomxato", "tomato", 1),
+        ("tmato", "tomato", 1),
+        ("tonatp", "tomato", 2),
+        ("xyz", "tomato", 3),
+    ],
+)
+def test_prefix_distance(term, word, distance):
+    assert prefix_distance(term, word, limit=2) == min(distance, 3)
+
+
+@pytest.mark.parametrize(
+    "term, max_edits, expected",
+    [
+        ("to", 0, {"tomato", "tofu"}),
+        ("tmo", 0, set()),
+        ("tmo", 1, {"tomato", "tofu"}),
+        ("potatp", 2, {"potato"}),
+        ("onoin", 1, {"onion"}),
+    ],
+)
+def test_fuzzy_prefix_search(term, max_edits, expected):
+    index = FuzzyPrefixIndex(["tomato", "tofu", "potato", "onion"])
+
+    assert index.search(term, max_edits) == expected
+
+
+def test_fuzzy_prefix_search_two_edits():
+    index = FuzzyPrefixIndex(["parmesan", "parsley", "pasta"])
+
+    assert index.search("parmasen", 2) == {"parmesan"}
+
+
+words = st.text(alphabet="abcd", min_size=1, max_size=8)
+
+
+@given(st.lists(words, max_size=20), words, st.integers(min_value=0, max_value=2))
+def test_fuzzy_prefix_search_matches_scan(vocabulary, term, max_edits):
+    index = FuzzyPrefixIndex(vocabulary)
+
+    expected = {
+        word
+        for word in vocabulary
+        if prefix_distance(term, word, max_edits) <= max_edits
+    }
+    assert index.search(term, max_edits) == expected
@@ -0,0 +1,32 @@
+from reciperadar import app
+from reciperadar.utils.fragments import JSONFragment
+
+
+class StaticFragment(JSONFragment):
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content
+
+
+def test_fragments_spliced():
+    doc = {
+        "results": [StaticFragment('{"id":"a"}'), {"id": "b"}],
+        "total": StaticFragment("2"),
+    }
+
+    text = app.json.dumps(doc, separators=(",", ":"))
+
+    assert text == '{"results":[{"id":"a"},{"id":"b"}],"total":2}'
+
+
+def test_fragment_placeholders_in_content():
+    doc = {"title": "\x00fragment:0", "recipe": StaticFragment('"\\u0000"')}
+
+    text = app.json.dumps(doc, separators=(",", ":"))
+
+    assert text == '{"recipe":"\\u0000","title":"\\u0000fragment:0"}'
@@ -0,0 +1,53 @@
+from threading import Event
+
+from reciperadar.utils.refresh import Refresher
+
+
+def test_refresher_runs_in_background():
+    refreshed = Event()
+    refresher = Refresher("test_refresher", refreshed.set, interval=0.01)
+
+    refresher.start()
+    try:
+        assert refreshed.wait(timeout=5)
+    finally:
+        refresher.stop()
+
+
+def test_refresher_immediate():
+    refreshed = Event()
+    refresher = Refresher("test_immediate", refreshed.set, interval=60, immediate=True)
+
+    refresher.start()
+    try:
+        assert refreshed.wait(timeout=5)
+    finally:
+        refresher.stop()
+
+
+def test_refresher_survives_errors():
+    calls = []
+    recovered = Event()
+
+    def refresh():
+        calls.append(True)
+        if len(calls) == 1:
+            raise Exception("synonym index unavailable")
+        recovered.set()
+
+    refresher = Refresher("test_refresher_errors", refresh, interval=0.01)
+
+    refresher.start()
+    try:
+        assert recovered.wait(timeout=5)
+    finally:
+        refresher.stop()
+
+
+def test_refresher_jitter():
+    refresher = Refresher("test_jitter", lambda: None, interval=100, jitter=0.1)
+
+    delays = [refresher.delay() for _ in range(100)]
+
+    assert all(90 <= delay <= 110 for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,79 @@
+import fcntl
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from reciperadar.utils.segments import SharedSegment
+
+
+@pytest.fixture
+def segment(tmp_path):
+    return SharedSegment(str(tmp_path / "synonyms"))
+
+
+def test_segment_lookup(segment):
+    mapping = {
+        "coriander": ["cilantro", "coriander"],
+        "tomato": ["tomato"],
+        "jalapeño": ["jalapeño", "green chili"],
+        "empty": [],
+    }
+    segment.write(mapping)
+
+    assert segment.reload()
+    assert len(segment) == 4
+    assert dict(segment) == mapping
+    assert segment.get("jalapeño") == ["jalapeño", "green chili"]
+    assert segment.get("onion") is None
+    assert "tomato" in segment
+    assert "tomatoes" not in segment
+
+
+def test_segment_missing(segment):
+    assert not segment.reload()
+    assert segment.loaded_at is None
+    assert len(segment) == 0
+    assert segment.get("tomato") is None
+
+
+def test_segment_replacement(segment):
+    segment.write({"tomato": ["tomato"]})
+    segment.reload()
+
+    segment.write({"onion": ["onion", "shallot"]})
+    assert segment.get("tomato") == ["tomato"]
+
+    segment.reload()
+    assert segment.get("tomato") is None
+    assert segment.get("onion") == ["onion", "shallot"]
+
+
+def test_segment_rebuild(segment):
+    expiry = datetime.now(tz=UTC) - timedelta(hours=1)
+    assert segment.rebuild(lambda: {"tomato": ["tomato"]}, expiry)
+    assert not segment.rebuild(lambda: {"onion": ["onion"]}, expiry)
+
+    segment.reload()
+    assert list(segment) == ["tomato"]
+
+
+def test_segment_rebuild_in_progress(segment):
+    expiry = datetime.now(tz=UTC)
+    with open(f"{segment.path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert not segment.rebuild(lambda: {"tomato": ["tomato"]}, expiry)
+    assert segment.loaded_at is None
+
+
+def test_segment_prefixed(segment):
+    segment.write({"pan": ["20"], "pancake pan": ["5"], "oven": ["50"], "pa": []})
+    segment.reload()
+
+    assert list(segment.prefixed("pan")) == [("pan", ["20"]), ("pancake pan", ["5"])]
+    assert list(segment.prefixed("panz")) == []
+    assert [key for key, _ in segment.prefixed("")] == [
+        "oven",
+        "pa",
+        "pan",
+        "pancake pan",
+    ]
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+
+from reciperadar.utils.singleflight import FlightGroup
+
+
+def _wait_for_callers(group, count):
+    while group.calls < count:
+        pass
+
+
+def test_concurrent_calls_coalesced():
+    group = FlightGroup("test_coalesced")
+    release = Event()
+    executions = []
+
+    def backend():
+        executions.append(True)
+        release.wait()
+        return {"results": []}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(group.do, "tomato", backend) for _ in range(5)]
+        _wait_for_callers(group, 5)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert group.coalesced == 4
+
+
+def test_concurrent_exceptions_shared():
+    group = FlightGroup("test_exceptions")
+    release = Event()
+
+    def backend():
+        release.wait()
+        raise ValueError("search failed")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(group.do, "tomato", backend) for _ in range(3)]
+        _wait_for_callers(group, 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_sequential_calls_not_coalesced():
+    group = FlightGroup("test_sequential")
+    results = [group.do("tomato", lambda: idx) for idx in range(3)]
+
+    assert results == [0, 1, 2]
+    assert group.coalesced == 0
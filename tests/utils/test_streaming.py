@@ -0,0 +1,28 @@
+from flask import jsonify
+
+from reciperadar import app
+from reciperadar.utils.streaming import iter_json
+
+
+def test_streaming_byte_compatible():
+    results = {
+        "authority": "api",
+        "total": 2,
+        "results": [{"id": "a", "title": "Café"}, {"id": "b", "time": 30}],
+        "facets": {"domains": [{"key": "example.test", "count": 2}]},
+        "refinements": [],
+    }
+
+    with app.app_context():
+        expected = jsonify(results).get_data(as_text=True)
+
+    assert "".join(iter_json(results)) == expected
+
+
+def test_streaming_empty_results():
+    results = {"authority": "api", "total": 0, "results": []}
+
+    with app.app_context():
+        expected = jsonify(results).get_data(as_text=True)
+
+    assert "".join(iter_json(results)) == expected